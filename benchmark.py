@@ -0,0 +1,154 @@
+import argparse
+import contextlib
+import datetime
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_epys_server import PAGE_STYLES, MockConfig, start_server
+
+# Dışa aktarım betiklerini sahte EPYS/CAS sunucusuna karşı uçtan uca ölçer.
+# Her akış ayrı bir süreçte çalışır; böylece tepe bellek (RSS) ölçümleri birbirine karışmaz.
+# Sayfa ve satır sayıları sunucu tarafındaki sayaçlardan okunur.
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+FLOWS = {
+    "single": os.path.join(ROOT_DIR, "hourly_meter_list.py"),
+    "multi": os.path.join(ROOT_DIR, "gddk-merged", "hourly_meter_list.py"),
+}
+
+def peak_rss_mb():
+    """Sürecin tepe bellek kullanımını MB olarak döndürür; ölçülemiyorsa None"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS bayt cinsinden döndürür
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def load_script(path):
+    # Betik, dizini sys.path'e eklenerek adıyla yüklenir; böylece "spawn" ile başlayan
+    # alt süreçler (--processes) de modülü içe aktarabilir
+    sys.path.insert(0, os.path.dirname(path))
+    return importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+def run_child(flow, base_url, workdir, versions, processes=0):
+    """Alt süreçte tek bir akışı çalıştırır ve ölçümleri JSON olarak yazdırır"""
+    script = load_script(FLOWS[flow])
+    script.CAS_BASE_URL = f"{base_url}/cas/v1"
+    script.BASE_URL = f"{base_url}/pre-reconciliation"
+    script.HOURLY_LIST_URL = f"{script.BASE_URL}/v1/meter-data/approved-meter-data/hourly/list"
+    os.chdir(workdir)
+
+    if flow == "multi":
+        # Çıktılar geçici dizine yazılır; önbellek kapalıdır, her sayfa ağdan gelir
+        script.SCRIPT_DIR = workdir
+        script.CACHE_ENABLED = False
+        script.CHECKPOINT_DIR = os.path.join(workdir, ".gddk_checkpoints")
+        script.STATE_DIR = os.path.join(workdir, ".gddk_state")
+        script.RUN_REPORT_PATH = os.path.join(workdir, "gddk_run_report.json")
+        # Efektif dönem, geçerli aydan geriye 'versions' adet versiyon sorgulanacak şekilde seçilir
+        period = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        for _ in range(versions):
+            period = (period - datetime.timedelta(days=1)).replace(day=1)
+        script.effective_start_str, script.effective_end_str = script.period_bounds(period)
+        run = lambda: script.main(["--processes", str(processes)])
+    else:
+        run = script.main
+
+    started = time.perf_counter()
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        run()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"elapsed": elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+def run_flow(flow, server, base_url, versions, processes=0):
+    """Akışı yeni bir süreçte çalıştırır; sunucu sayaçlarıyla birleştirilmiş sonucu döndürür"""
+    before = server.state.snapshot()
+    with tempfile.TemporaryDirectory(prefix=f"gddk_bench_{flow}_") as workdir:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", flow, "--base-url", base_url,
+             "--workdir", workdir, "--versions", str(versions), "--processes", str(processes)],
+            stdout=subprocess.PIPE, text=True, check=True,
+        )
+    after = server.state.snapshot()
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    counts = {name: after[name] - before[name] for name in after}
+    elapsed = result["elapsed"]
+    return {
+        "flow": flow,
+        "elapsed": round(elapsed, 3),
+        "pages": counts["pages"],
+        "pages_per_sec": round(counts["pages"] / elapsed, 1),
+        "rows": counts["rows"],
+        "rows_per_sec": round(counts["rows"] / elapsed, 1),
+        "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] is not None else None,
+        "requests": counts["tgt"] + counts["st"] + counts["list"],
+        "bytes": counts["bytes"],
+    }
+
+def print_results(results):
+    header = f"{'akış':<8}{'süre (sn)':>11}{'sayfa':>8}{'sayfa/sn':>10}{'satır':>10}{'satır/sn':>11}{'tepe RSS (MB)':>15}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rss = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "-"
+        print(f"{r['flow']:<8}{r['elapsed']:>11.2f}{r['pages']:>8}{r['pages_per_sec']:>10.1f}"
+              f"{r['rows']:>10}{r['rows_per_sec']:>11.1f}{rss:>15}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GDDK dışa aktarım betikleri için verim ölçümü")
+    parser.add_argument("--flows", default="single,multi", help="Ölçülecek akışlar: single, multi")
+    parser.add_argument("--meters", type=int, default=50, help="Sahte sunucudaki sayaç sayısı")
+    parser.add_argument("--hours", type=int, help="Sayaç başına saat (verilmezse efektif aralıktan)")
+    parser.add_argument("--versions", type=int, default=3, help="Çok versiyonlu akışta sorgulanacak versiyon sayısı")
+    parser.add_argument("--latency", type=float, default=0.0, help="Liste yanıtı başına sunucu gecikmesi (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-style", choices=PAGE_STYLES, default="total")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Çok versiyonlu akışta tablolaştırma/yazma için süreç sayısı (0 = iş parçacığında)")
+    parser.add_argument("--repeat", type=int, default=1, help="Her akışın kaç kez çalıştırılacağı")
+    parser.add_argument("--json", help="Sonuçların yazılacağı JSON dosyası (sürümleri karşılaştırmak için)")
+    # Alt süreç parametreleri
+    parser.add_argument("--child", choices=sorted(FLOWS), help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        return run_child(args.child, args.base_url, args.workdir, args.versions, args.processes)
+
+    config = MockConfig(meters=args.meters, hours=args.hours, page_style=args.page_style,
+                        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    server, base_url = start_server(config)
+    print(f"Sahte sunucu: {base_url} | {args.meters} sayaç, gecikme {args.latency} sn, "
+          f"hata oranı {args.error_rate}, sayfa biçimi {args.page_style}\n")
+
+    results = []
+    try:
+        for flow in args.flows.split(","):
+            for _ in range(args.repeat):
+                results.append(run_flow(flow.strip(), server, base_url, args.versions, args.processes))
+    finally:
+        server.shutdown()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nSonuçlar {args.json} dosyasına yazıldı.")
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,43 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import json
 import datetime
+import argparse
+import logging
+import sys
+import contextlib
+import functools
+import gzip
+import hashlib
+import itertools
+import sqlite3
 import pandas as pd
 import os
+import pickle
+import shutil
+import tempfile
+import threading
+import multiprocessing
+import queue
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from openpyxl import Workbook
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # Hızlı JSON çözümü isteğe bağlıdır; yoksa standart json kullanılır
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Feather çıktısı isteğe bağlıdır
+    pa = None
+
+# Çıktı "gddk" günlükçüsü üzerinden yazılır; --quiet ile yalnızca uyarı ve hatalar kalır
+logger = logging.getLogger("gddk")
+_log_handler = None
 
 # Betiğin bulunduğu dizini tespit et
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,19 +55,895 @@ CAS_BASE_URL = "https://cas.epias.com.tr/cas/v1"
 BASE_URL = "https://epys.epias.com.tr/pre-reconciliation"
 HOURLY_LIST_URL = f"{BASE_URL}/v1/meter-data/approved-meter-data/hourly/list"
 
+# Yeniden deneme ayarları
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 1
+RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]  # 429/503 yanıtlarındaki Retry-After başlığına uyulur
+
+# İlk sayfadan sonraki sayfaları eşzamanlı çeken işçi sayısı (1 = sıralı çekme)
+MAX_PAGE_WORKERS = 4
+
+# Aynı anda işlenen versiyon sayısı (1 = versiyonlar sırayla işlenir)
+MAX_VERSION_WORKERS = 4
+
+# Versiyon tablolaştırma ve dosya yazma işini yapan süreç sayısı (0 = versiyon iş parçacığında yapılır)
+EXPORT_PROCESSES = 0
+# Süreç havuzu kullanılırken aynı anda çekilen ya da işlenen en fazla versiyon sayısı; bellek tavanını belirler
+MAX_INFLIGHT_VERSIONS = 4
+
+# Versiyon ve sayfa işçilerinin paylaştığı küresel eşzamanlı HTTP istek bütçesi
+MAX_CONCURRENT_REQUESTS = 8
+# Eşzamanlılık bu sınırın altında AIMD ile ayarlanır: başarılı isteklerde yavaşça artar,
+# 429/5xx yanıtlarında ya da gecikme ortalamanın bu katını aştığında yarıya iner
+LATENCY_SPIKE_FACTOR = 3
+
+# Versiyon dosyalarının biçimi: "xlsx", "parquet" veya "feather" (son ikisi için pyarrow gerekir)
+OUTPUT_FORMAT = "xlsx"
+# Sütunlu biçimlerde birleştirilmiş veriye ek olarak Excel raporu da yazılsın mı
+WRITE_EXCEL_REPORT = True
+# effectiveDate sütununun dönüştürüleceği saat dilimi
+LOCAL_TIMEZONE = "Europe/Istanbul"
+# API öğelerindeki iç içe nesnelerin sabit sütun eşlemesi: nesne -> [(alt alan, sütun, tip)]
+# (kök dizindeki tek versiyonluk betik de aynı sütun adlarını üretir)
+NESTED_COLUMNS = {
+    'meter': [('id', 'meterId', 'Int64'), ('name', 'meterName', 'string'), ('eic', 'meterEic', 'string')],
+    'settlementPoint': [('value', 'settlementPointId', 'Int64'), ('label', 'settlementPointName', 'string')],
+    'readingType': [('value', 'readingTypeId', 'Int64'), ('label', 'readingType', 'string')],
+    'usageType': [('value', 'usageTypeId', 'Int64'), ('label', 'usageType', 'string')],
+    'meterReadingCompany': [('value', 'meterReadingCompanyId', 'Int64'), ('label', 'meterReadingCompany', 'string')],
+}
+COLUMN_TYPES = {column: dtype for mapping in NESTED_COLUMNS.values() for _, column, dtype in mapping}
+# Saatlik değer sütunları (float64). Sayısala yalnızca bunlar ve kimlik sütunları dönüştürülür;
+# diğer metin sütunları baştaki sıfırlarıyla birlikte metin olarak kalır
+HOURLY_VALUE_COLUMNS = ['consumption', 'generation']
+METER_COLUMN = 'meterId'
+
+# Versiyon dosyaları isteğe bağlı ara çıktılardır; birleştirme her durumda bellekteki tablolarla yapılır
+WRITE_VERSION_FILES = True
+
+# Sürüm özetinde terminale yazdırılacak en fazla sayaç satırı (tamamı özet sayfasında/dosyasında)
+SUMMARY_PRINT_LIMIT = 50
+
+# Liste servisinde sayfa başına istenen kayıt sayısı
+PAGE_SIZE = 100
+# Uyarlamalı sayfa boyutu: PAGE_SIZE'dan başlayıp sunucunun kabul ettiği en büyük boyuta kadar ikiye katlanır
+ADAPTIVE_PAGE_SIZE = True
+MAX_PAGE_SIZE = 2000
+
+# Çekilen sayfaların sıkıştırılmış yerel önbelleği (yayınlanmış GDDK versiyonları değişmez)
+CACHE_ENABLED = True
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".gddk_cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Aşıldığında en uzun süredir kullanılmayan sayfalar silinir
+# True ise önbellek okunmaz, sayfalar yeniden indirilip önbelleğe yazılır (--refresh)
+REFRESH_CACHE = False
+
+# Yarıda kalan çalışmaların kaldığı yerden devam etmesi için kontrol noktası dizini
+CHECKPOINT_DIR = os.path.join(SCRIPT_DIR, ".gddk_checkpoints")
+# Başarısız bir sayfanın, versiyon başarısız sayılmadan önce yeniden denenme sayısı
+PAGE_RETRY_LIMIT = 3
+
+# Artımlı mod: dönem başına birleştirilmiş versiyonlar ve çözümlenmiş veri burada tutulur
+INCREMENTAL = False
+STATE_DIR = os.path.join(SCRIPT_DIR, ".gddk_state")
+
+# Yerel SQLite deposu: çekilen sayaç-saatleri (sayaç, effectiveDate, versiyon) anahtarıyla saklanır
+# ve birleştirme "en yeni versiyon" tablosundan okunur (None = kapalı; --store ile de açılır)
+STORE_PATH = None  # ör. os.path.join(SCRIPT_DIR, "gddk_store.sqlite")
+
+# Versiyon keşfi: versiyonlar önce tek satırlık bir sorguyla yoklanır, yalnızca yayınlanmış olanlar çekilir
+VERSION_DISCOVERY = True
+# Yayınlanmadığı görülen (dönem, versiyon) çiftleri bu süre (saniye) boyunca yeniden sorgulanmaz
+MISSING_VERSION_TTL = 30 * 24 * 3600
+
+# Akış hattı: yazıcıya tek seferde verilen satır sayısı (bellek tepe değeri buna bağlıdır)
+EXPORT_CHUNK_SIZE = 5000
+# Eşzamanlı modda sırası gelmeden önden çekilebilecek en fazla sayfa (işçi sayısının katı)
+PAGE_WINDOW_FACTOR = 2
+
+# Önceden alınıp havuzda bekletilen ST sayısı (0 = ön getirme kapalı)
+ST_PREFETCH_SIZE = 4
+# Servis biletleri kısa ömürlüdür; bu süreden (saniye) eski biletler kullanılmadan atılır
+ST_MAX_AGE = 10
+# Reddedilen bir sayfa, TGT yenilendikten sonra en fazla bu kadar tekrar oynatılır
+TICKET_REPLAY_LIMIT = 2
+
+# Excel sayfası başına en fazla satır (başlık dahil); aşılınca VERI_2, VERI_3... sayfalarına geçilir
+EXCEL_MAX_ROWS = 1048576
+
+# Çalışma raporu: aşama süreleri, HTTP gecikme histogramı, yeniden deneme ve bayt sayaçları (None = yazılmaz)
+RUN_REPORT_PATH = os.path.join(SCRIPT_DIR, "gddk_run_report.json")
+# node_exporter textfile toplayıcısı için Prometheus çıktısı (ör. /var/lib/node_exporter/gddk.prom)
+PROMETHEUS_TEXTFILE = None
+# HTTP gecikme histogramının üst sınırları (saniye)
+HTTP_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Her işçi iş parçacığı kendi oturumunu (bağlantı havuzunu) kullanır
+_thread_local = threading.local()
+
+def configure_logging(quiet=False):
+    """Günlük çıktısını düz metin olarak stdout'a yönlendirir; sessiz kipte yalnızca uyarı ve hatalar yazılır"""
+    global _log_handler
+    if _log_handler is None:
+        _log_handler = logging.StreamHandler(sys.stdout)
+        _log_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(_log_handler)
+        logger.propagate = False
+    else:
+        # stdout sonradan yönlendirilmiş olabilir (ör. ölçüm betiği)
+        _log_handler.setStream(sys.stdout)
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
+
+def endpoint_name(url):
+    """İstek adresini rapordaki uç nokta adına çevirir: cas_tgt, cas_st, hourly_list"""
+    path = urlsplit(url or "").path.rstrip("/")
+    if path.endswith("/hourly/list"):
+        return "hourly_list"
+    if path.endswith("/tickets"):
+        return "cas_tgt"
+    if "/tickets/" in path:
+        return "cas_st"
+    return "other"
+
+class RunMetrics:
+    """Çalışma boyunca aşama sürelerini ve HTTP ölçümlerini toplar; sonunda JSON/Prometheus raporu yazar.
+
+    Aşama süreleri çağrı başına toplanır; eşzamanlı işçilerde toplam süre
+    duvar saatini aşabilir. HTTP gecikmesi yanıt başlıklarına kadar geçen
+    süredir; urllib3'ün kendi içinde tekrar ettiği denemeler ayrıca sayılır.
+    """
+
+    def __init__(self, buckets=HTTP_LATENCY_BUCKETS):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.stages = {}
+            self.http = {}
+            self.retries = {}
+            self.info = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started)
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            entry = self.stages.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def observe_http(self, endpoint, status, seconds, bytes_sent, bytes_received):
+        with self.lock:
+            entry = self.http.setdefault(endpoint, {
+                "requests": 0, "statuses": {}, "seconds": 0.0, "bytes_sent": 0, "bytes_received": 0,
+                "buckets": [0] * len(self.buckets),
+            })
+            entry["requests"] += 1
+            entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+            entry["seconds"] += seconds
+            entry["bytes_sent"] += bytes_sent
+            entry["bytes_received"] += bytes_received
+            # Prometheus histogramı gibi kümülatif: her kova kendi sınırına kadar olan istekleri sayar
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+
+    def count_retry(self, endpoint, reason):
+        with self.lock:
+            reasons = self.retries.setdefault(endpoint, {})
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    def add_stages(self, stages):
+        """Başka bir süreçte ölçülmüş aşama sürelerini ekler"""
+        with self.lock:
+            for name, other in stages.items():
+                entry = self.stages.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                entry["count"] += other["count"]
+                entry["seconds"] += other["seconds"]
+                entry["max_seconds"] = max(entry["max_seconds"], other["max_seconds"])
+
+    def set_info(self, name, value):
+        with self.lock:
+            self.info[name] = value
+
+    def report(self, status):
+        """Raporu JSON'a yazılabilir sözlük olarak döndürür"""
+        finished = time.time()
+        with self.lock:
+            http = {}
+            for endpoint, entry in self.http.items():
+                latency = {str(bound): count for bound, count in zip(self.buckets, entry["buckets"])}
+                latency["+Inf"] = entry["requests"]
+                http[endpoint] = {
+                    "requests": entry["requests"],
+                    "statuses": dict(entry["statuses"]),
+                    "seconds": round(entry["seconds"], 3),
+                    "bytes_sent": entry["bytes_sent"],
+                    "bytes_received": entry["bytes_received"],
+                    "latency_buckets": latency,
+                }
+            return {
+                "status": status,
+                "started": datetime.datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "finished": datetime.datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+                "elapsed_seconds": round(finished - self.started, 3),
+                "stages": {
+                    name: {"count": e["count"], "seconds": round(e["seconds"], 3),
+                           "max_seconds": round(e["max_seconds"], 3)}
+                    for name, e in self.stages.items()
+                },
+                "http": http,
+                "retries": {endpoint: dict(reasons) for endpoint, reasons in self.retries.items()},
+                **self.info,
+            }
+
+    def prometheus_text(self, report):
+        """Raporu Prometheus metin biçimine (textfile toplayıcısı) çevirir"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        metric("gddk_run_success", "gauge", "Son çalışma eksiksiz tamamlandıysa 1",
+               [({}, 1 if report["status"] == "ok" else 0)])
+        metric("gddk_run_duration_seconds", "gauge", "Son çalışmanın süresi",
+               [({}, report["elapsed_seconds"])])
+        metric("gddk_run_last_finished_timestamp_seconds", "gauge", "Son çalışmanın bitiş zamanı",
+               [({}, int(time.time()))])
+        metric("gddk_stage_seconds_total", "counter", "Aşamada geçen toplam süre",
+               [({"stage": name}, e["seconds"]) for name, e in report["stages"].items()])
+        metric("gddk_stage_calls_total", "counter", "Aşama çağrı sayısı",
+               [({"stage": name}, e["count"]) for name, e in report["stages"].items()])
+
+        histogram = []
+        for endpoint, entry in report["http"].items():
+            histogram += [({"endpoint": endpoint, "le": bound}, count)
+                          for bound, count in entry["latency_buckets"].items()]
+        lines.append("# HELP gddk_http_request_duration_seconds HTTP yanıt başlıklarına kadar geçen süre")
+        lines.append("# TYPE gddk_http_request_duration_seconds histogram")
+        for labels, value in histogram:
+            lines.append(f'gddk_http_request_duration_seconds_bucket{{endpoint="{labels["endpoint"]}",'
+                         f'le="{labels["le"]}"}} {value}')
+        for endpoint, entry in report["http"].items():
+            lines.append(f'gddk_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {entry["seconds"]}')
+            lines.append(f'gddk_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {entry["requests"]}')
+
+        metric("gddk_http_requests_total", "counter", "Durum koduna göre HTTP yanıtları",
+               [({"endpoint": endpoint, "status": status}, count)
+                for endpoint, entry in report["http"].items() for status, count in entry["statuses"].items()])
+        metric("gddk_http_retries_total", "counter", "Taşıma katmanında tekrar edilen istekler",
+               [({"endpoint": endpoint, "reason": reason}, count)
+                for endpoint, reasons in report["retries"].items() for reason, count in reasons.items()])
+        metric("gddk_http_bytes_sent_total", "counter", "Gönderilen istek gövdesi baytları",
+               [({"endpoint": endpoint}, entry["bytes_sent"]) for endpoint, entry in report["http"].items()])
+        metric("gddk_http_bytes_received_total", "counter", "Alınan yanıt gövdesi baytları",
+               [({"endpoint": endpoint}, entry["bytes_received"]) for endpoint, entry in report["http"].items()])
+        return "\n".join(lines) + "\n"
+
+    def write(self, status, json_path=None, prom_path=None):
+        """Raporu JSON ve/veya Prometheus textfile olarak atomik biçimde yazar"""
+        report = self.report(status)
+        outputs = []
+        if json_path:
+            outputs.append((json_path, json.dumps(report, ensure_ascii=False, indent=2)))
+        if prom_path:
+            outputs.append((prom_path, self.prometheus_text(report)))
+        for path, text in outputs:
+            # Toplayıcı yarım yazılmış dosyayı okumasın diye geçici dosya üzerinden değiştirilir
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            logger.info(f"[RAPOR] Çalışma raporu {path} dosyasına yazıldı.")
+        return report
+
+METRICS = RunMetrics()
+
+def timed(stage):
+    """Fonksiyonun her çağrısının süresini METRICS'e verilen aşama adıyla ekler"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with METRICS.stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class ObservedRetry(Retry):
+    """Aşırı yük yanıtlarını (429/5xx) hız denetleyicisine bildiren yeniden deneme politikası.
+
+    urllib3 bu yanıtları kendi içinde yeniden denediği için uygulama katmanı
+    onları hiç görmez; denetleyici ve çalışma raporu ancak bu kanca üzerinden
+    haberdar olur.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and response.status in RETRY_STATUS_FORCELIST:
+            REQUEST_BUDGET.overloaded(self.get_retry_after(response))
+        reason = str(response.status) if response is not None else type(error).__name__
+        METRICS.count_retry(endpoint_name(url), reason)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def record_http_response(response, *args, **kwargs):
+    """Oturum yanıt kancası: gecikme, durum kodu ve gövde baytlarını METRICS'e işler"""
+    body = response.request.body
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    METRICS.observe_http(endpoint_name(response.request.url), response.status_code,
+                         response.elapsed.total_seconds(), len(body or b""), len(response.content))
+
 def create_retry_session():
     session = requests.Session()
-    retry = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[500, 502, 503, 504],
+    retry = ObservedRetry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_FORCELIST,
         allowed_methods=["POST", "GET"]
     )
     adapter = HTTPAdapter(max_retries=retry)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
+    session.hooks["response"].append(record_http_response)
     return session
 
+def build_list_payload(page_number, version_date_str, effective_start, effective_end, page_size=None):
+    """Saatlik liste servisinin JSON gövdesini üretir (önbellek anahtarı da buradan türetilir)"""
+    # swagger.json'daki HourlyMeterDataReqDto ile eşleşen payload
+    return {
+        "effectiveDateStart": effective_start,
+        "effectiveDateEnd": effective_end,
+        "version": version_date_str,
+        "isRetrospective": True,
+        "isLastVersion": True,
+        "page": {
+            "number": page_number,
+            "size": page_size or PAGE_SIZE
+        }
+    }
+
+def json_loads(data):
+    """JSON metnini orjson kuruluysa onunla, değilse standart json ile çözer"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@timed("parse_list_response")
+def parse_list_response(data):
+    """Liste yanıtını çözer ve yalnızca kullanılan body.content.items / page kısımlarını tutar.
+
+    Hata yanıtları (gövdesiz) olduğu gibi döndürülür.
+    """
+    response_data = json_loads(data)
+    body = response_data.get('body') if isinstance(response_data, dict) else None
+    if not body:
+        return response_data
+    content = body.get('content') or {}
+    return {'body': {'content': {'items': content.get('items', []), 'page': content.get('page', {})}}}
+
+def json_dumps(obj):
+    """Nesneyi sıkıştırılmış JSON baytlarına çevirir (orjson varsa onunla)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def is_version_mismatch(body_text):
+    """Hata yanıtının yayınlanmamış versiyon ("versiyon uyumsuzdur") hatası olup olmadığını döndürür"""
+    try:
+        errors = json.loads(body_text).get('errors') or []
+    except (ValueError, AttributeError):
+        return False
+    return any("uyumsuzdur" in (err.get('errorMessage') or '') for err in errors)
+
+def report_list_error(status_code, body_text):
+    """Başarısız liste yanıtının hata ayrıntılarını günlüğe yazar.
+
+    Yayınlanmamış versiyon (uyumsuz) yanıtı taramanın olağan sonucudur ve
+    bilgi düzeyinde kalır; diğer hatalar uyarı olarak yazılır.
+    """
+    lines = [f"BAŞARISIZ: Durum {status_code}"]
+    level = logging.WARNING
+    # Mümkünse tam hatayı yazdır
+    try:
+        error_data = json.loads(body_text)
+        if 'errors' in error_data and error_data['errors']:
+            for err in error_data['errors']:
+                lines.append(f"HATA: {err.get('errorCode')} - {err.get('errorMessage')}")
+                if "uyumsuzdur" in err.get('errorMessage', ''):
+                    lines.append("İPUCU: Kontrol edilen versiyon tarihi bu dönem için geçerli GDDK yayın tarihiyle eşleşmiyor olabilir.")
+                    level = logging.INFO
+    except:
+        lines.append(body_text)
+    for line in lines:
+        logger.log(level, line)
+
+class PageCache:
+    """Liste yanıtlarını sorgu gövdesine göre anahtarlayıp gzip ile diskte saklar.
+
+    Anahtar; kullanıcı adı ve liste uç noktası (scope) ile efektif başlangıç/bitiş,
+    versiyon, isRetrospective, isLastVersion, sayfa numarası ve sayfa boyutundan
+    türetilir; farklı hesap ya da ortamın yanıtları birbirine karışmaz. Toplam boyut max_bytes'ı
+    aştığında en uzun süredir okunmayan dosyalar silinir (LRU). Anahtar sayfa
+    boyutuna bağlı olduğundan her (dönem, versiyon) için seçilen boyut da
+    page_sizes.json dosyasında saklanır; sonraki çalışmalar aynı boyutla çeker.
+    """
+
+    def __init__(self, directory, max_bytes, scope):
+        self.directory = directory
+        self.scope = hashlib.sha256(json.dumps(scope).encode("utf-8")).hexdigest()[:16]
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.sizes_path = os.path.join(directory, "page_sizes.json")
+        self.sizes = None
+
+    def _path(self, payload):
+        key = hashlib.sha256(f"{self.scope}|{json.dumps(payload, sort_keys=True)}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, payload):
+        path = self._path(payload)
+        try:
+            with gzip.open(path, "rb") as f:
+                data = json_loads(f.read())
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        # Son kullanım zamanı güncellenir (LRU tahliyesi için)
+        os.utime(path)
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def put(self, payload, response_data):
+        path = self._path(payload)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(json_dumps(response_data))
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self.total_bytes += size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _size_key(self, effective_start, effective_end, version_label):
+        return f"{self.scope}|{effective_start}|{effective_end}|{version_label}"
+
+    def _load_sizes(self):
+        if self.sizes is None:
+            try:
+                with open(self.sizes_path, encoding="utf-8") as f:
+                    self.sizes = json.load(f)
+            except (OSError, ValueError):
+                self.sizes = {}
+        return self.sizes
+
+    def page_size(self, effective_start, effective_end, version_label):
+        """Versiyonun önceki çalışmalarda çekildiği sayfa boyutunu döndürür; yoksa None"""
+        with self.lock:
+            return self._load_sizes().get(self._size_key(effective_start, effective_end, version_label))
+
+    def save_page_sizes(self, sizes):
+        """{(efektif başlangıç, efektif bitiş, versiyon): boyut} kayıtlarını dosyaya ekler"""
+        with self.lock:
+            entries = self._load_sizes()
+            entries.update({self._size_key(*key): size for key, size in sizes.items()})
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.sizes_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=1)
+            os.replace(tmp_path, self.sizes_path)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        # Boyut sınırının %90'ına inene kadar en eski dosyalar silinir
+        target = self.max_bytes * 0.9
+        for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self.total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except OSError:
+                pass
+
+_page_cache = None
+
+def get_page_cache():
+    """Etkinse paylaşılan sayfa önbelleğini döndürür"""
+    global _page_cache
+    if not CACHE_ENABLED:
+        return None
+    if _page_cache is None:
+        _page_cache = PageCache(CACHE_DIR, CACHE_MAX_BYTES, [USERNAME, HOURLY_LIST_URL])
+    return _page_cache
+
+def load_cached_page(page_number, version_date_str, effective_start, effective_end, page_size=None):
+    """Sayfa önbellekte varsa (ve --refresh verilmediyse) yanıtı döndürür"""
+    cache = get_page_cache()
+    if cache is None or REFRESH_CACHE:
+        return None
+    return cache.get(build_list_payload(page_number, version_date_str, effective_start, effective_end, page_size))
+
+def store_cached_page(page_number, version_date_str, effective_start, effective_end, response_data, page_size=None):
+    """Gövdesi dolu başarılı yanıtları önbelleğe yazar (hata ve boş yanıtlar saklanmaz)"""
+    cache = get_page_cache()
+    if cache is None or not (response_data and response_data.get('body')):
+        return
+    cache.put(build_list_payload(page_number, version_date_str, effective_start, effective_end, page_size),
+              response_data)
+
+class PageFetchError(Exception):
+    """Bir sayfa tüm yeniden denemelere rağmen alınamadığında fırlatılır"""
+
+class RunManifest:
+    """Çalışmanın (versiyon, sayfa) bazında ilerlemesini kaydeder.
+
+    Her başarılı sayfa gzip ile kontrol noktası dizinine yazılır ve manifestte
+    yolu ile birlikte işaretlenir. Yarıda kalan bir çalışma yeniden başlatıldığında
+    kaydedilmiş sayfalar diskten okunur, yalnızca eksik sayfalar çekilir.
+    """
+
+    def __init__(self, period_label, effective_start, effective_end, restart=False):
+        self.directory = os.path.join(CHECKPOINT_DIR, period_label)
+        self.path = os.path.join(self.directory, "manifest.json")
+        self.lock = threading.Lock()
+        self.data = None
+
+        if not restart and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Aynı dönem etiketi farklı bir tarih aralığı için kullanılmışsa kayıt geçersizdir
+            if (data.get("effective_start"), data.get("effective_end")) == (effective_start, effective_end):
+                self.data = data
+                done = sum(
+                    1 for version in data["versions"].values()
+                    for page in version["pages"].values() if page["status"] == "done"
+                )
+                logger.info(f"[KONTROL NOKTASI] Önceki çalışma bulundu: {len(data['versions'])} versiyon, "
+                      f"{done} sayfa diskten devam ettirilecek.")
+
+        if self.data is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.data = {"effective_start": effective_start, "effective_end": effective_end, "versions": {}}
+
+    def _version(self, version_label):
+        return self.data["versions"].setdefault(
+            version_label, {"status": "running", "page_size": None, "total_pages": None, "pages": {}}
+        )
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def start_version(self, version_label, total_pages, page_size):
+        """Versiyonun sayfa boyutunu ve toplam sayfa sayısını kaydeder; boyut değiştiyse eski sayfaları geçersiz kılar"""
+        with self.lock:
+            version = self._version(version_label)
+            if version["page_size"] != page_size:
+                version["pages"] = {
+                    number: entry for number, entry in version["pages"].items()
+                    if entry.get("page_size") == page_size
+                }
+            version["page_size"] = page_size
+            version["total_pages"] = total_pages
+            version["status"] = "running"
+            self._save()
+
+    def page_size(self, version_label):
+        """Versiyon için daha önce sabitlenmiş sayfa boyutunu döndürür; yoksa None"""
+        with self.lock:
+            version = self.data["versions"].get(version_label)
+            return version["page_size"] if version else None
+
+    def version_status(self, version_label):
+        with self.lock:
+            version = self.data["versions"].get(version_label)
+            return version["status"] if version else None
+
+    def set_version_status(self, version_label, status):
+        with self.lock:
+            self._version(version_label)["status"] = status
+            self._save()
+
+    def load_page(self, version_label, page_number, page_size):
+        """Aynı sayfa boyutuyla kaydedilmiş sayfayı (öğeler, sayfa bilgisi) olarak döndürür; yoksa None"""
+        with self.lock:
+            version = self.data["versions"].get(version_label)
+            entry = version["pages"].get(str(page_number)) if version else None
+        if not entry or entry["status"] != "done" or entry.get("page_size") != page_size:
+            return None
+        try:
+            with gzip.open(entry["path"], "rb") as f:
+                page = json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+        return page["items"], page["page"]
+
+    def save_page(self, version_label, page_number, items, page_info, page_size):
+        path = os.path.join(self.directory, version_label, f"page-{page_number:05d}.json.gz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "wb") as f:
+            f.write(json_dumps({"items": items, "page": page_info}))
+        with self.lock:
+            self._version(version_label)["pages"][str(page_number)] = {
+                "status": "done", "path": path, "items": len(items), "page_size": page_size
+            }
+            self._save()
+
+    def mark_page_failed(self, version_label, page_number, error):
+        with self.lock:
+            version = self._version(version_label)
+            version["pages"][str(page_number)] = {"status": "failed", "error": str(error)}
+            version["status"] = "failed"
+            self._save()
+
+    def complete(self):
+        """Tüm versiyonlar başarıyla bittiğinde kontrol noktası dosyalarını siler"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class PeriodState:
+    """Artımlı mod için efektif dönemin durum deposu.
+
+    Daha önce birleştirilmiş versiyonları ve "en yeni versiyon kazanır" kuralıyla
+    çözümlenmiş veriyi saklar. Sonraki çalışmalarda yalnızca eksik versiyonlar
+    çekilir ve saklanan sonuca katlanır.
+    """
+
+    def __init__(self, period_label, effective_start, effective_end):
+        self.directory = os.path.join(STATE_DIR, period_label)
+        self.path = os.path.join(self.directory, "state.json")
+        self.data_path = os.path.join(self.directory, "resolved.pkl")
+        self.effective_range = (effective_start, effective_end)
+        self.versions = []
+
+        if os.path.exists(self.path) and os.path.exists(self.data_path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            # Tarih aralığı değiştiyse saklanan sonuç bu dönem için geçersizdir
+            if (state.get("effective_start"), state.get("effective_end")) == self.effective_range:
+                self.versions = state["versions"]
+
+    def missing(self, month_labels):
+        """Henüz birleştirilmemiş versiyon etiketlerini döndürür"""
+        return [label for label in month_labels if label not in self.versions]
+
+    def load_resolved(self):
+        """Saklanan çözümlenmiş veriyi döndürür; yoksa None"""
+        if not self.versions:
+            return None
+        return pd.read_pickle(self.data_path)
+
+    def save(self, merged_df, merged_versions):
+        """Çözümlenmiş veriyi ve birleştirilen versiyonları atomik olarak kaydeder.
+
+        Tamamen ezilen versiyonlar çözümlenmiş veride görünmez; bu yüzden
+        birleştirmeye giren tüm versiyonlar ayrıca kaydedilir.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        versions = sorted(set(self.versions) | set(merged_versions))
+
+        tmp_path = f"{self.data_path}.tmp"
+        merged_df.to_pickle(tmp_path)
+        os.replace(tmp_path, self.data_path)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "effective_start": self.effective_range[0],
+                "effective_end": self.effective_range[1],
+                "versions": versions,
+                "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.versions = versions
+
+class VersionCatalog:
+    """Yayınlanmadığı doğrulanan (dönem, versiyon) çiftlerinin kalıcı olumsuz önbelleği.
+
+    Kayıtlar STATE_DIR altında tutulur ve MISSING_VERSION_TTL sonunda düşer.
+    Geçerli ayın versiyonu ay içinde yayınlanabileceği için hiç kaydedilmez.
+    """
+
+    def __init__(self, ttl=MISSING_VERSION_TTL):
+        self.path = os.path.join(STATE_DIR, "missing_versions.json")
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+            # Süresi dolmuş kayıtlar yüklenirken atılır
+            now = time.time()
+            self.entries = {key: checked for key, checked in entries.items() if now - checked < self.ttl}
+
+    @staticmethod
+    def _key(plan, version_label):
+        return f"{plan['start']}|{plan['end']}|{version_label}"
+
+    def is_missing(self, plan, version_label):
+        return self._key(plan, version_label) in self.entries
+
+    def mark_missing(self, plan, version_label):
+        if version_label >= datetime.datetime.now().strftime('%Y-%m'):
+            return
+        with self.lock:
+            self.entries[self._key(plan, version_label)] = time.time()
+
+    def save(self):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self.lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+class AdaptiveRateLimiter:
+    """Eşzamanlı istek sınırını sunucu geri bildirimine göre AIMD ile ayarlar.
+
+    Tüm işçiler aynı sınırı paylaşır. Başarılı her yanıtta sınır 1/sınır kadar
+    artar (yaklaşık tur başına bir istek); 429/5xx yanıtında ya da gecikme
+    sıçramasında yarıya iner. Yanıt süresi sayfa boyutuyla değiştiğinden
+    gecikme ortalaması her sayfa boyutu için ayrı tutulur; tek satırlık keşif
+    yoklamaları büyük sayfaları sıçrama gibi göstermez. Retry-After başlığı geldiğinde yeni istekler o
+    süre boyunca bekletilir. Sınır MAX_CONCURRENT_REQUESTS değerini aşmaz.
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.latency = {}
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                delay = self.paused_until - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, started=None, page_size=None):
+        """İstek hakkını iade eder; başlangıç zamanı verilirse sınır, aynı sayfa boyutundaki ortalamaya göre ayarlanır"""
+        with self.condition:
+            self.in_flight -= 1
+            # Bir düşürmeden önce başlamış istekler (ör. Retry-After beklemiş olanlar) sınırı yeniden etkilemez
+            if started is not None and started > self.last_decrease:
+                latency = time.monotonic() - started
+                baseline = self.latency.get(page_size)
+                if baseline is not None and latency > LATENCY_SPIKE_FACTOR * baseline:
+                    self._decrease(f"gecikme sıçraması ({latency:.2f} sn, sayfa boyutu {page_size})")
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                # Ortalama sıçramalarla da güncellenir; kalıcı yavaşlama zamanla yeni normal olur
+                self.latency[page_size] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            self.condition.notify_all()
+
+    def overloaded(self, retry_after=None):
+        """Sunucu 429/5xx döndürdüğünde çağrılır"""
+        with self.condition:
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                logger.info(f"  [HIZ] Sunucu {retry_after:.0f} sn beklenmesini istedi (Retry-After).")
+            self._decrease("sunucu aşırı yük bildirdi")
+            self.condition.notify_all()
+
+    def _decrease(self, reason):
+        # Aynı tıkanıklığa takılan eşzamanlı istekler sınırı yalnızca bir kez düşürür
+        now = time.monotonic()
+        if now - self.last_decrease < max(max(self.latency.values(), default=0.0), 1.0):
+            return
+        self.last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+        self.decreases += 1
+        logger.info(f"  [HIZ] Eşzamanlı istek sınırı {int(self.limit)} değerine düşürüldü: {reason}")
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def stats(self):
+        with self.condition:
+            return {"limit": int(self.limit), "decreases": self.decreases,
+                    "latency": {str(size): latency for size, latency in sorted(self.latency.items())}}
+
+REQUEST_BUDGET = AdaptiveRateLimiter(MAX_CONCURRENT_REQUESTS)
+
+class PageSizer:
+    """Sunucunun kabul ettiği en büyük sayfa boyutunu bulur.
+
+    İlk dolu sayfa veren versiyonun birinci sayfası boyut ikiye katlanarak
+    tekrar istenir. Sunucu isteği reddederse ya da istenenden az kayıt
+    döndürürse (boyutu sessizce kısıyorsa) bir önceki boyutta kalınır.
+    Sayfa numaraları boyuta bağlı olduğundan her versiyon tek bir boyutla
+    çekilir; yoklama versiyon işçileri başlamadan settle_page_sizes içinde yapılır.
+    """
+
+    def __init__(self, initial, maximum):
+        self.size = initial
+        self.maximum = maximum
+        self.settled = not ADAPTIVE_PAGE_SIZE or initial >= maximum
+        self.lock = threading.Lock()
+
+    def current(self):
+        with self.lock:
+            return self.size
+
+    def probe(self, result, page_size, fetch):
+        """Birinci sayfa sonucuyla daha büyük boyutları dener; (boyut, sonuç) döndürür"""
+        with self.lock:
+            if self.settled or page_size != self.size:
+                return page_size, result
+            while True:
+                items, page_info = result
+                if len(items) < page_size or calculate_total_pages(page_info, page_size) <= 1:
+                    # Veri tek sayfaya sığıyor; daha büyük boyut hakkında bilgi vermez
+                    return page_size, result
+                candidate = min(page_size * 2, self.maximum)
+                try:
+                    bigger = fetch(candidate)
+                except (requests.RequestException, TicketRejectedError, VersionNotPublishedError):
+                    bigger = None
+                # Reddedilen ya da sessizce kısılan (eksik dolu ama devamı olan) boyut kabul edilmez
+                if bigger is None or (len(bigger[0]) < candidate and calculate_total_pages(bigger[1], candidate) > 1):
+                    break
+                page_size, result = candidate, bigger
+                self.size = page_size
+                if page_size >= self.maximum:
+                    break
+            self.settled = True
+            logger.info(f"  [HIZ] Sayfa boyutu {page_size} olarak sabitlendi.")
+            return page_size, result
+
+class TicketRejectedError(Exception):
+    """Veri servisi ST/TGT biletini reddettiğinde (HTTP 401) fırlatılır"""
+
+class VersionNotPublishedError(Exception):
+    """Veri servisi sorgulanan versiyonun dönem için yayınlanmadığını (uyumsuz) bildirdiğinde fırlatılır"""
+
+@timed("get_tgt")
 def get_tgt(session):
     url = f"{CAS_BASE_URL}/tickets"
     headers = {
@@ -41,12 +952,12 @@ def get_tgt(session):
     }
     data = {"username": USERNAME, "password": PASSWORD}
     
-    print(f"\n[ADIM 1] TGT alınıyor: {url}...")
+    logger.info(f"\n[ADIM 1] TGT alınıyor: {url}...")
     response = session.post(url, headers=headers, data=data, allow_redirects=False)
     
     if response.status_code not in [200, 201]:
-        print(f"BAŞARISIZ: Durum {response.status_code}")
-        print(response.text)
+        logger.error(f"BAŞARISIZ: Durum {response.status_code}")
+        logger.info(response.text)
         response.raise_for_status()
 
     tgt_location = response.headers.get("Location")
@@ -55,209 +966,1040 @@ def get_tgt(session):
     else:
         tgt = response.text.strip()
     
-    print(f"BAŞARILI: TGT = {tgt[:15]}...")
+    logger.info(f"BAŞARILI: TGT = {tgt[:15]}...")
     return tgt
 
+@timed("get_st")
 def get_st(session, tgt, service_url):
     url = f"{CAS_BASE_URL}/tickets/{tgt}"
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
     data = {"service": service_url}
     
-    print(f"[ADIM 2] Servis için ST alınıyor: {service_url}...")
+    logger.info(f"[ADIM 2] Servis için ST alınıyor: {service_url}...")
     response = session.post(url, headers=headers, data=data)
     response.raise_for_status()
     
     st = response.text.strip()
-    print(f"BAŞARILI: ST = {st[:15]}...")
+    logger.info(f"BAŞARILI: ST = {st[:15]}...")
     return st
 
-def list_hourly_meter_datas(session, tgt, st, page_number, version_date_str, effective_start, effective_end):
-    print(f"\n[ADIM 3] Saatlik Sayaç Verisi Liste Servisi Çağrılıyor (Sayfa {page_number})...")
+@timed("list_hourly_meter_datas")
+def list_hourly_meter_datas(session, tgt, st, page_number, version_date_str, effective_start, effective_end,
+                            page_size=None):
+    logger.info(f"\n[ADIM 3] Saatlik Sayaç Verisi Liste Servisi Çağrılıyor (Sayfa {page_number})...")
     url = f"{HOURLY_LIST_URL}?ticket={st}"
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
         "TGT": tgt
     }
-    
-    # swagger.json'daki HourlyMeterDataReqDto ile eşleşen payload
-    payload = {
-        "effectiveDateStart": effective_start,
-        "effectiveDateEnd": effective_end,
-        "version": version_date_str,
-        "isRetrospective": True,
-        "isLastVersion": True,
-        "page": {
-            "number": page_number,
-            "size": 100 # Verimlilik için boyut artırıldı
-        }
-    }
+    payload = build_list_payload(page_number, version_date_str, effective_start, effective_end, page_size)
     
     response = session.post(url, headers=headers, json=payload)
     
     if response.status_code == 200:
-        return response.json()
+        # Ham baytlar doğrudan çözülür; yalnızca öğeler ve sayfa bilgisi tutulur
+        return parse_list_response(response.content)
+    elif response.status_code == 401:
+        logger.error(f"BAŞARISIZ: Durum 401 - Bilet reddedildi (Sayfa {page_number})")
+        raise TicketRejectedError(f"Liste servisi bileti reddetti (Sayfa {page_number})")
     else:
-        print(f"BAŞARISIZ: Durum {response.status_code}")
-        # Mümkünse tam hatayı yazdır
-        try:
-            error_data = response.json()
-            if 'errors' in error_data and error_data['errors']:
-                for err in error_data['errors']:
-                    print(f"HATA: {err.get('errorCode')} - {err.get('errorMessage')}")
-                    if "uyumsuzdur" in err.get('errorMessage', ''):
-                        print("İPUCU: Kontrol edilen versiyon tarihi bu dönem için geçerli GDDK yayın tarihiyle eşleşmiyor olabilir.")
-        except:
-            print(response.text)
+        report_list_error(response.status_code, response.text)
+        if is_version_mismatch(response.text):
+            raise VersionNotPublishedError(f"Versiyon {version_date_str[:7]} bu dönem için yayınlanmamış")
         return None
 
-def fetch_data_for_version(session, tgt, version_date_str, effective_start, effective_end):
-    """Belirli bir versiyon için tüm sayfalı verileri çeker"""
-    all_items = []
-    current_page = 1
-    total_pages = 1
+def get_worker_session():
+    """İş parçacığına özel yeniden deneme oturumunu döndürür"""
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = create_retry_session()
+    return _thread_local.session
+
+class TicketManager:
+    """TGT yaşam döngüsünü ve önceden alınmış ST havuzunu yönetir.
+
+    Arka plandaki bir iş parçacığı havuzu ST_PREFETCH_SIZE bilete kadar
+    doldurur; böylece CAS gecikmesi sayfalama yolundan çıkar. CAS bir TGT'yi
+    reddettiğinde ya da veri servisi 401 döndürdüğünde TGT yeniden alınır.
+    TGT ve ön getirme ilk bilet talebinde başlar; tüm sayfalar önbellekten
+    geliyorsa CAS'a hiç gidilmez.
+    """
+
+    def __init__(self, session, service_url=None, prefetch_size=ST_PREFETCH_SIZE):
+        self.session = session
+        self.service_url = service_url or HOURLY_LIST_URL
+        self.lock = threading.Lock()
+        self.counters = {"issued": 0, "wasted": 0, "refreshed": 0}
+        self.tgt = None
+        self.generation = 0
+        self.pool = queue.Queue()
+        self.prefetch_size = prefetch_size
+        self.stop_event = threading.Event()
+        self.prefetcher = None
+
+    def _ensure_started(self):
+        """İlk talepte TGT'yi alır ve ön getirme iş parçacığını başlatır"""
+        with self.lock:
+            if self.tgt is not None:
+                return
+            self.tgt = get_tgt(self.session)
+            if self.prefetch_size > 0:
+                self.prefetcher = threading.Thread(target=self._prefetch_loop, daemon=True)
+                self.prefetcher.start()
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def _issue(self, session):
+        """CAS'tan yeni bir ST alır; (st, tgt, nesil, zaman) döndürür"""
+        for attempt in range(TICKET_REPLAY_LIMIT + 1):
+            tgt, generation = self.tgt, self.generation
+            try:
+                with REQUEST_BUDGET:
+                    st = get_st(session, tgt, self.service_url)
+            except requests.HTTPError as e:
+                # CAS TGT'yi tanımıyorsa (süresi dolmuş) yenileyip tekrar dene
+                status = e.response.status_code if e.response is not None else None
+                if status not in (400, 401, 404) or attempt == TICKET_REPLAY_LIMIT:
+                    raise
+                logger.warning(f"  CAS TGT'yi reddetti (Durum {status}), TGT yenileniyor...")
+                self.refresh_tgt(generation)
+                continue
+            self._count("issued")
+            return st, tgt, generation, time.monotonic()
+
+    def _prefetch_loop(self):
+        session = create_retry_session()
+        while not self.stop_event.is_set():
+            if self.pool.qsize() >= self.prefetch_size:
+                self.stop_event.wait(0.05)
+                continue
+            try:
+                self.pool.put(self._issue(session))
+            except requests.RequestException as e:
+                logger.warning(f"  ST ön getirme hatası: {e}")
+                self.stop_event.wait(1)
+
+    def _is_fresh(self, ticket):
+        _, _, generation, issued_at = ticket
+        return generation == self.generation and time.monotonic() - issued_at < ST_MAX_AGE
+
+    def get_ticket(self, session):
+        """Havuzdan taze bir bilet alır, havuz boşsa doğrudan CAS'tan ister; (tgt, st, nesil) döndürür"""
+        self._ensure_started()
+        while True:
+            try:
+                ticket = self.pool.get_nowait()
+            except queue.Empty:
+                ticket = self._issue(session)
+                break
+            if self._is_fresh(ticket):
+                break
+            self._count("wasted")
+        st, tgt, generation, _ = ticket
+        return tgt, st, generation
+
+    def refresh_tgt(self, failed_generation):
+        """TGT'yi yeniler; aynı nesil için eşzamanlı çağrılardan yalnızca biri CAS'a gider"""
+        with self.lock:
+            if self.generation != failed_generation:
+                return
+            self.tgt = get_tgt(self.session)
+            self.generation += 1
+            self.counters["refreshed"] += 1
+
+    def close(self):
+        """Ön getirmeyi durdurur ve kullanılmayan biletleri boşa giden olarak sayar"""
+        self.stop_event.set()
+        if self.prefetcher:
+            self.prefetcher.join()
+        self._count("wasted", self.pool.qsize())
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+def calculate_total_pages(page_info, page_size):
+    """API sayfa bilgisinden toplam sayfa sayısını hesaplar; boyut bildirilmezse istenen sayfa boyutu kullanılır"""
+    # Güçlü sayfalama algılama
+    api_total_pages = page_info.get('totalPages', page_info.get('totalPageCount'))
+    if api_total_pages is not None:
+        return api_total_pages
+
+    # totalPages eksikse, 'total' öğe veya sayfa sayısı olabilir
+    total_val = page_info.get('total', 1)
+    size_val = page_info.get('size') or page_size
+
+    # Sezgisel: total büyükse muhtemelen öğelerdir, küçükse muhtemelen sayfalardır
+    # Ancak güvenli olmakta fayda var: EPYS'de Sayfa içindeki 'total' genellikle toplam öğe sayısıdır
+    if total_val > 50: # Arbitrary threshold, but usually more than total pages
+        return (total_val + size_val - 1) // size_val
+    return total_val
+
+def fetch_page(session, ticket_manager, page_number, version_date_str, effective_start, effective_end,
+               page_size=None):
+    """Tek bir sayfayı (önbellekte yoksa) kendi ST bileti ile çeker; (öğeler, sayfa bilgisi) veya None döndürür"""
+    response_data = load_cached_page(page_number, version_date_str, effective_start, effective_end, page_size)
     
-    while current_page <= total_pages:
-        st = get_st(session, tgt, HOURLY_LIST_URL)
-        response_data = list_hourly_meter_datas(
-            session, tgt, st, current_page, version_date_str, effective_start, effective_end
-        )
-        
-        if response_data and 'body' in response_data and response_data['body']:
-            content = response_data['body'].get('content', {})
-            items = content.get('items', [])
-            all_items.extend(items)
-            
-            # Sayfalama bilgisini kontrol et
-            page_info = content.get('page', {})
-            
-            # Güçlü sayfalama algılama
-            api_total_pages = page_info.get('totalPages', page_info.get('totalPageCount'))
-            if api_total_pages is not None:
-                total_pages = api_total_pages
-            else:
-                # totalPages eksikse, 'total' öğe veya sayfa sayısı olabilir
-                total_val = page_info.get('total', 1)
-                size_val = page_info.get('size', 100)
-                
-                # Sezgisel: total büyükse muhtemelen öğelerdir, küçükse muhtemelen sayfalardır
-                # Ancak güvenli olmakta fayda var: EPYS'de Sayfa içindeki 'total' genellikle toplam öğe sayısıdır
-                if total_val > 50: # Arbitrary threshold, but usually more than total pages
-                    total_pages = (total_val + size_val - 1) // size_val
-                else:
-                    total_pages = total_val
-            
-            print(f"  Sayfa {current_page}/{total_pages} getirildi ({len(items)} öğe, Toplam: {len(all_items)})")
-            
+    for attempt in range(TICKET_REPLAY_LIMIT + 1):
+        if response_data is not None:
+            break
+        tgt, st, generation = ticket_manager.get_ticket(session)
+        try:
+            # Her HTTP çağrısı küresel istek bütçesinden bir hak tüketir; gecikme hız denetimine bildirilir
+            REQUEST_BUDGET.acquire()
+            started = time.monotonic()
+            completed = False
+            try:
+                response_data = list_hourly_meter_datas(
+                    session, tgt, st, page_number, version_date_str, effective_start, effective_end, page_size
+                )
+                completed = True
+            finally:
+                REQUEST_BUDGET.release(started if completed else None, page_size or PAGE_SIZE)
+            store_cached_page(page_number, version_date_str, effective_start, effective_end, response_data, page_size)
+            break
+        except TicketRejectedError:
+            if attempt == TICKET_REPLAY_LIMIT:
+                raise
+            # Reddedilen sayfa yeni TGT ile tekrar oynatılır
+            ticket_manager.refresh_tgt(generation)
+
+    if response_data and 'body' in response_data and response_data['body']:
+        content = response_data['body'].get('content', {})
+        return content.get('items', []), content.get('page', {})
+
+    label = version_date_str[:7]
+    if response_data:
+        logger.info(f"  [{label}] Sayfa {page_number} alınamadı - Gövde boş veya hata oluştu.")
+    else:
+        logger.info(f"  [{label}] Sayfa {page_number} alınamadı - Yanıt verisi yok.")
+    return None
+
+def obtain_page(session, ticket_manager, page_number, version_date_str, effective_start, effective_end,
+                manifest=None, page_size=None):
+    """Sayfayı kontrol noktasından okur ya da çeker; alınamayan sayfalar için PageFetchError fırlatır.
+
+    İlk sayfanın "versiyon uyumsuz" hatası ya da boş yanıtı versiyonun
+    yayınlanmadığı anlamına gelir ve None döner. Diğer sayfalarda veri sessizce kesilmez; sayfa PAGE_RETRY_LIMIT
+    kez yeniden denenir, yine alınamazsa manifestte başarısız olarak işaretlenir.
+    """
+    label = version_date_str[:7]
+    if manifest is not None:
+        result = manifest.load_page(label, page_number, page_size)
+        if result is not None:
+            return result
+
+    last_error = None
+    for attempt in range(PAGE_RETRY_LIMIT + 1):
+        if attempt:
+            logger.warning(f"  [{label}] Sayfa {page_number} yeniden deneniyor ({attempt}/{PAGE_RETRY_LIMIT}): {last_error}")
+            time.sleep(RETRY_BACKOFF_FACTOR * (2 ** (attempt - 1)))
+        try:
+            result = fetch_page(session, ticket_manager, page_number, version_date_str, effective_start, effective_end,
+                                page_size)
+        except VersionNotPublishedError as e:
+            if page_number == 1:
+                return None
+            last_error = e
+            continue
+        except (requests.RequestException, TicketRejectedError) as e:
+            last_error = e
+            continue
+        if result is not None:
+            if manifest is not None:
+                manifest.save_page(label, page_number, *result, page_size)
+            return result
+        if page_number == 1 and last_error is None:
+            return None
+        last_error = "Boş yanıt"
+
+    if manifest is not None:
+        manifest.mark_page_failed(label, page_number, last_error)
+    raise PageFetchError(f"[{label}] Sayfa {page_number} {PAGE_RETRY_LIMIT} yeniden denemeye rağmen alınamadı: {last_error}")
+
+def probe_version(session, ticket_manager, version_date_str, effective_start, effective_end):
+    """Versiyonun yayınlanıp yayınlanmadığını tek satırlık bir sayfa ile yoklar.
+
+    Kayıt dönerse True, yalnızca servis "versiyon uyumsuz" hatası verirse
+    False döndürür; yalnızca bu sonuç olumsuz önbelleğe yazılır. Ağ hatası,
+    diğer hata yanıtları ya da boş sayfa gibi belirsiz durumlarda None döner;
+    versiyon yine normal şekilde çekilir.
+    """
+    try:
+        result = fetch_page(session, ticket_manager, 1, version_date_str, effective_start, effective_end,
+                            page_size=1)
+    except VersionNotPublishedError:
+        return False
+    except (requests.RequestException, TicketRejectedError):
+        return None
+    if result is not None and result[0]:
+        return True
+    return None
+
+def settle_page_sizes(jobs, ticket_manager, manifests, page_sizer):
+    """Her (dönem, versiyon) işinin sayfa boyutunu versiyon işçileri başlamadan belirler.
+
+    Yarıda kalan versiyonlar kontrol noktasındaki, önceki çalışmalarda çekilmiş
+    olanlar önbellekte kayıtlı boyutla sürdürülür; böylece önbellek anahtarları
+    değişmez. Diğerleri için boyut, ilk dolu versiyonun birinci sayfasıyla bir
+    kez yoklanır ve sayfa kontrol noktasına yazılır. {(dönem, versiyon): boyut} döndürür.
+    """
+    cache = get_page_cache()
+    sizes = {}
+    unknown = []
+    for plan, month_dt in jobs:
+        month_label = month_dt.strftime('%Y-%m')
+        page_size = manifests[plan["label"]].page_size(month_label)
+        if page_size is None and cache is not None and not REFRESH_CACHE:
+            page_size = cache.page_size(plan["start"], plan["end"], month_label)
+        if page_size is None:
+            unknown.append((plan, month_dt))
+        else:
+            sizes[(plan["label"], month_label)] = page_size
+
+    session = get_worker_session()
+    with METRICS.stage("settle_page_sizes"):
+        for plan, month_dt in unknown:
+            if page_sizer.settled:
+                break
+            month_label = month_dt.strftime('%Y-%m')
+            version_str = month_dt.strftime('%Y-%m-01T00:00:00+03:00')
+            manifest = manifests[plan["label"]]
+            page_size = page_sizer.current()
+            try:
+                result = obtain_page(session, ticket_manager, 1, version_str, plan["start"], plan["end"],
+                                     manifest, page_size)
+            except PageFetchError:
+                # Hata versiyonun kendi işçisinde yeniden denenip raporlanır
+                continue
+            if result is None:
+                continue
+            probed_size, result = page_sizer.probe(result, page_size, lambda size: fetch_page(
+                session, ticket_manager, 1, version_str, plan["start"], plan["end"], size
+            ))
+            if probed_size != page_size:
+                manifest.save_page(month_label, 1, *result, probed_size)
+
+    for plan, month_dt in unknown:
+        sizes[(plan["label"], month_dt.strftime('%Y-%m'))] = page_sizer.current()
+    if cache is not None and jobs:
+        plans = {plan["label"]: plan for plan, _ in jobs}
+        cache.save_page_sizes({
+            (plans[period]["start"], plans[period]["end"], month_label): page_size
+            for (period, month_label), page_size in sizes.items()
+        })
+    return sizes
+
+def iter_version_pages(session, ticket_manager, version_date_str, effective_start, effective_end,
+                       max_workers=MAX_PAGE_WORKERS, manifest=None, page_size=None):
+    """Bir versiyonun sayfalarını sayfa sırasıyla üretir (her adımda bir sayfanın öğe listesi)"""
+    label = version_date_str[:7]
+
+    # Yarıda kalan versiyon kaydedildiği boyutla sürdürülür; yoksa önceden belirlenen boyut kullanılır
+    resumed_size = manifest.page_size(label) if manifest is not None else None
+    page_size = resumed_size or page_size or PAGE_SIZE
+
+    # İlk sayfa sıralı çekilir; toplam sayfa sayısı bu yanıttan hesaplanır
+    result = obtain_page(session, ticket_manager, 1, version_date_str, effective_start, effective_end,
+                         manifest, page_size)
+    if result is None:
+        return
+
+    items, page_info = result
+    total_items = len(items)
+    total_pages = calculate_total_pages(page_info, page_size)
+    if manifest is not None:
+        manifest.start_version(label, total_pages, page_size)
+    logger.info(f"  [{label}] Sayfa 1/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+    yield items
+
+    if max_workers <= 1:
+        # Sıralı mod: her sayfa bir öncekinin ardından çekilir
+        current_page = 2
+        while current_page <= total_pages:
+            items, page_info = obtain_page(session, ticket_manager, current_page, version_date_str,
+                                           effective_start, effective_end, manifest, page_size)
+            total_items += len(items)
+            total_pages = calculate_total_pages(page_info, page_size)
+            logger.info(f"  [{label}] Sayfa {current_page}/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+            yield items
             current_page += 1
+        return
+
+    # Eşzamanlı mod: kalan sayfalar işçilere dağıtılır, her işçi kendi ST biletini alır
+    def worker(page_number):
+        return obtain_page(get_worker_session(), ticket_manager, page_number,
+                           version_date_str, effective_start, effective_end, manifest, page_size)
+
+    # Bellekte sınırlı sayıda sayfa tutmak için kayan pencere kullanılır
+    window = max_workers * PAGE_WINDOW_FACTOR
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        next_page = 2
+        while pending or next_page <= total_pages:
+            while next_page <= total_pages and len(pending) < window:
+                pending.append((next_page, executor.submit(worker, next_page)))
+                next_page += 1
+
+            # Sonuçlar sayfa sırasına göre üretilir; alınamayan sayfa tüm versiyonu başarısız kılar
+            page_number, future = pending.popleft()
+            try:
+                items, _ = future.result()
+            except PageFetchError:
+                for _, waiting in pending:
+                    waiting.cancel()
+                raise
+            total_items += len(items)
+            logger.info(f"  [{label}] Sayfa {page_number}/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+            yield items
+
+@timed("decode_items")
+def decode_items(items):
+    """Sayfa öğelerini satır sözlüğü kopyalamadan sütun listelerine çözer; {sütun: değerler} döndürür.
+
+    İç içe nesneler NESTED_COLUMNS ile sabit sütunlara eşlenir ve bu sütunlar
+    her sayfada (nesne hiç gelmese de) bulunur. Şemada olmayan alt alanlar
+    veri kaybı olmasın diye nesne_alan adıyla ayrıca eklenir.
+    """
+    columns = {}
+    first = items[0]
+    keys = list(first) + sorted(set().union(*items).difference(first))
+    keys += [key for key in NESTED_COLUMNS if key not in keys]
+    for key in keys:
+        mapping = NESTED_COLUMNS.get(key)
+        if mapping is None:
+            columns[key] = [item.get(key) for item in items]
+            continue
+        objects = [item.get(key) or {} for item in items]
+        for sub_key, column, _ in mapping:
+            columns[column] = [obj.get(sub_key) for obj in objects]
+        known = {sub_key for sub_key, _, _ in mapping}
+        for sub_key in sorted(set().union(*objects).difference(known)):
+            columns[f"{key}_{sub_key}"] = [obj.get(sub_key) for obj in objects]
+    return columns
+
+def concat_columns(parts):
+    """(sütunlar, satır sayısı) parçalarını birleştirir; bazı sayfalarda olmayan sütunlar None ile doldurulur"""
+    if len(parts) == 1:
+        return parts[0][0]
+    names = list(dict.fromkeys(name for columns, _ in parts for name in columns))
+    merged = {}
+    for name in names:
+        values = []
+        for columns, row_count in parts:
+            values.extend(columns[name] if name in columns else [None] * row_count)
+        merged[name] = values
+    return merged
+
+def iter_column_chunks(pages, chunk_size=None):
+    """Sayfa akışını sayfa sınırlarında, yaklaşık chunk_size satırlık sütun parçalarına toplar"""
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    parts, row_count = [], 0
+    for items in pages:
+        if not items:
+            continue
+        parts.append((decode_items(items), len(items)))
+        row_count += len(items)
+        if row_count >= chunk_size:
+            yield concat_columns(parts), row_count
+            parts, row_count = [], 0
+    if parts:
+        yield concat_columns(parts), row_count
+
+def iter_frames(pages, version_label, chunk_size=None):
+    """Sayfa akışını tipleri düzeltilmiş DataFrame parçalarına dönüştürür"""
+    for columns, row_count in iter_column_chunks(pages, chunk_size):
+        columns['versiyon_bilgisi'] = [version_label] * row_count
+        yield normalize_frame(pd.DataFrame(columns))
+
+class ExcelChunkWriter:
+    """DataFrame parçalarını yalnızca-yazma (write-only) kipinde .xlsx dosyasına akıtır.
+
+    Parçalar geldikçe geçici bir ara dosyaya alınır, çalışma kitabı bellekte
+    kurulmaz. Bazı sütunlar ancak sonraki parçalarda göründüğünden başlık
+    close sırasında tüm sütunlarla yazılır ve satırlar ara dosyadan okunarak
+    akıtılır. Veri sayfası EXCEL_MAX_ROWS sınırına ulaşınca aynı başlıkla
+    VERI_2, VERI_3... sayfalarına geçilir.
+    """
+
+    def __init__(self, path, sheet_name="VERI"):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_count = 0
+        self.sheet_rows = 0
+        self.columns = {}
+        self.spool = tempfile.TemporaryFile()
+        self.extra_sheets = []
+        self.row_count = 0
+
+    def _next_sheet(self):
+        self.sheet_count += 1
+        title = self.sheet_name if self.sheet_count == 1 else f"{self.sheet_name}_{self.sheet_count}"
+        self.sheet = self.workbook.create_sheet(title)
+        self.sheet.append(self.columns)
+        self.sheet_rows = 1
+
+    def write(self, df):
+        # Başlık, sütunların görülme sırasıyla tüm parçalardan toplanır
+        self.columns.update(dict.fromkeys(df.columns))
+        pickle.dump(df, self.spool, protocol=pickle.HIGHEST_PROTOCOL)
+        self.row_count += len(df)
+
+    def write_sheet(self, name, df):
+        """Ek bir tabloyu (ör. sürüm özeti) veri sayfalarından sonra kendi sayfasına yazar"""
+        self.extra_sheets.append((name, df))
+
+    def close(self):
+        self.columns = list(self.columns)
+        self._next_sheet()
+        self.spool.seek(0)
+        while True:
+            try:
+                df = pickle.load(self.spool)
+            except EOFError:
+                break
+            if list(df.columns) != self.columns:
+                df = df.reindex(columns=self.columns)
+            for row in excel_values(df).itertuples(index=False, name=None):
+                if self.sheet_rows >= EXCEL_MAX_ROWS:
+                    self._next_sheet()
+                self.sheet.append(row)
+                self.sheet_rows += 1
+        self.spool.close()
+        for name, df in self.extra_sheets:
+            sheet = self.workbook.create_sheet(name)
+            sheet.append(list(df.columns))
+            for row in excel_values(df).itertuples(index=False, name=None):
+                sheet.append(row)
+        self.workbook.save(self.path)
+
+def excel_values(df):
+    """Excel'in desteklemediği saat dilimi ve NA değerlerini dönüştürür"""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            # Excel saat dilimli zaman damgalarını desteklemez; yerel saate çevrilir
+            df[column] = df[column].dt.tz_localize(None)
+    return df.astype(object).where(df.notna(), None)
+
+def normalize_frame(df):
+    """Sütun tiplerini düzeltir: saat dilimli effectiveDate, sayısal saatlik değerler, kimlikler.
+
+    Tümü boş gelen sütunlar sayısal sayılmaz; tipi bilinmiyorsa metin olarak
+    kalır, böylece sonraki parçalarda gelen değerlerle şema çakışmaz.
+    """
+    for column in df.columns:
+        values = df[column]
+        dtype = 'float64' if column in HOURLY_VALUE_COLUMNS else COLUMN_TYPES.get(column)
+        if column == 'versiyon_bilgisi' or dtype == 'string':
+            df[column] = values.astype('string')
+        elif column == 'effectiveDate':
+            df[column] = pd.to_datetime(values, utc=True).dt.tz_convert(LOCAL_TIMEZONE)
+        elif dtype is not None:
+            converted = pd.to_numeric(values, errors='coerce')
+            if converted.notna().sum() != values.notna().sum():
+                # Sayısal olmayan değer içeren sütunlar metin olarak kalır
+                df[column] = values.astype('string')
+                continue
+            # Saatlik değerler bir sayfada tam sayı, diğerinde ondalık gelebilir
+            df[column] = converted.astype(dtype)
+        elif values.dtype == object:
+            non_null = values.dropna()
+            if len(non_null) and non_null.map(type).eq(bool).all():
+                df[column] = values.astype('boolean')
+            else:
+                df[column] = values.astype('string')
+        elif pd.api.types.is_integer_dtype(values):
+            df[column] = values.astype('float64')
+    return df
+
+class ArrowChunkWriter:
+    """Satır parçalarını tipli Arrow tablolarına çevirip Parquet veya Feather (Arrow IPC) dosyasına akıtır"""
+
+    def __init__(self, path, file_format):
+        if pa is None:
+            raise RuntimeError(f"'{file_format}' çıktısı için 'pyarrow' paketi gerekli: pip install pyarrow")
+        self.path = path
+        self.file_format = file_format
+        self.writer = None
+        self.schema = None
+        self.row_count = 0
+
+    def write(self, df):
+        # Versiyon, bölümleme (partition) dizin adında tutulur
+        df = df.drop(columns=['versiyon_bilgisi'], errors='ignore')
+
+        if self.schema is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # Tümü boş gelen sütunlar için metin tipi varsayılır
+            self.schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ]).remove_metadata()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self.file_format == "parquet":
+                self.writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.path, self.schema)
         else:
-            if response_data:
-                print(f"  Sayfa {current_page} konumunda durduruluyor - Gövde boş veya hata oluştu.")
+            extra = set(df.columns) - set(self.schema.names)
+            if extra:
+                logger.warning(f"  UYARI: Şemada olmayan sütunlar yazılmadı: {sorted(extra)}")
+            df = df.reindex(columns=self.schema.names)
+            # İlk parçada metin (ya da tümü boş) olan sütun sonraki parçada başka tipte gelebilir
+            for field in self.schema:
+                is_text = pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+                if is_text and not pd.api.types.is_string_dtype(df[field.name]):
+                    df[field.name] = df[field.name].astype('string')
+
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.row_count += len(df)
+
+    def close(self):
+        self.writer.close()
+
+# Biçim -> (yazıcı fabrikası, versiyon dosyası yolu üreticisi)
+OUTPUT_WRITERS = {
+    "xlsx": (
+        lambda path: ExcelChunkWriter(path),
+        lambda period, version: f"GDDK_{period}_Versiyon_{version}.xlsx",
+    ),
+    "parquet": (
+        lambda path: ArrowChunkWriter(path, "parquet"),
+        lambda period, version: os.path.join(f"GDDK_{period}_parquet", f"versiyon_bilgisi={version}", "part-0.parquet"),
+    ),
+    "feather": (
+        lambda path: ArrowChunkWriter(path, "feather"),
+        lambda period, version: os.path.join(f"GDDK_{period}_feather", f"versiyon_bilgisi={version}", "part-0.arrow"),
+    ),
+}
+
+def version_output_path(eff_period_label, month_label, output_format=None):
+    """Seçilen biçime göre versiyon dosyasının (göreli) yolunu döndürür"""
+    return OUTPUT_WRITERS[output_format or OUTPUT_FORMAT][1](eff_period_label, month_label)
+
+def export_frames(frames, filename, version_label, output_format=None):
+    """DataFrame parça akışını seçilen biçimde dosyaya yazar; yazılan satır sayısını döndürür"""
+    output_format = output_format or OUTPUT_FORMAT
+    path = os.path.join(SCRIPT_DIR, filename)
+    writer = None
+    for chunk in frames:
+        if writer is None:
+            # Dosya yalnızca en az bir satır geldiğinde oluşturulur
+            logger.info(f"  [{version_label}] Kayıtlar {filename} dosyasına akıtılıyor...")
+            writer = OUTPUT_WRITERS[output_format][0](path)
+        # Parça akışı ağdan beslenir; aşama süresine yalnızca yazma dahil edilir
+        with METRICS.stage("export_write"):
+            writer.write(chunk)
+
+    if writer is None:
+        return 0
+    with METRICS.stage("export_write"):
+        writer.close()
+    logger.info(f"  [{version_label}] BAŞARILI: {writer.row_count} kayıt {filename} dosyasına aktarıldı\n")
+    return writer.row_count
+
+@timed("write_frame")
+def write_frame(df, filename, summary_df=None):
+    """Birleştirilmiş tabloyu uzantısına göre Parquet, Feather veya Excel olarak kaydeder.
+
+    Sürüm özeti verilirse Excel'de ayrı bir sayfaya, sütunlu biçimlerde
+    '<ad>_SURUM_OZETI' dosyasına yazılır.
+    """
+    path = os.path.join(SCRIPT_DIR, filename)
+    base, extension = os.path.splitext(path)
+    if extension == ".parquet":
+        df.to_parquet(path, index=False)
+        if summary_df is not None:
+            summary_df.to_parquet(f"{base}_SURUM_OZETI.parquet", index=False)
+    elif extension == ".arrow":
+        df.reset_index(drop=True).to_feather(path)
+        if summary_df is not None:
+            summary_df.reset_index(drop=True).to_feather(f"{base}_SURUM_OZETI.arrow")
+    else:
+        # Satırlar EXPORT_CHUNK_SIZE'lık dilimlerle akıtılır; tüm çalışma kitabı bellekte kurulmaz
+        writer = ExcelChunkWriter(path)
+        for start in range(0, max(len(df), 1), EXPORT_CHUNK_SIZE):
+            writer.write(df.iloc[start:start + EXPORT_CHUNK_SIZE])
+        if summary_df is not None:
+            writer.write_sheet("SURUM_OZETI", summary_df)
+        writer.close()
+
+class MeterStore:
+    """Sayaç-saatlerinin yerel SQLite deposu.
+
+    meter_hours tablosu her versiyonun satırlarını (meterId, effectiveDate,
+    versiyon_bilgisi) birincil anahtarıyla tutar; latest_meter_hours her
+    (meterId, effectiveDate) için en yeni versiyonun satırını saklayan
+    materyalize tablodur. Sütunlar ilk yüklenen parçadan türetilir, yeni
+    alanlar geldikçe iki tabloya da eklenir. SQLite tipleri pandas tiplerini
+    taşımadığından (ör. boolean INTEGER olarak saklanır) her sütunun pandas
+    tipi column_types tablosuna yazılır ve okurken geri uygulanır. Her parça
+    tek bir işlemde yüklenir; eşzamanlı versiyon işçileri tek bağlantıyı
+    kilitle paylaşır.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL: okuyucular (ör. analiz sorguları) yükleme sürerken engellenmez
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.columns = [row[1] for row in self.connection.execute("PRAGMA table_info(meter_hours)")]
+        self.connection.execute("CREATE TABLE IF NOT EXISTS column_types (name TEXT PRIMARY KEY, dtype TEXT)")
+        self.dtypes = dict(self.connection.execute("SELECT name, dtype FROM column_types"))
+
+    @staticmethod
+    def _sql_type(dtype):
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            return "INTEGER"
+        if pd.api.types.is_float_dtype(dtype):
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def _quote(column):
+        return '"' + column.replace('"', '""') + '"'
+
+    def _record_types(self, df):
+        """Parçanın pandas tiplerini column_types tablosuna yazar.
+
+        Bir sütun parçalar arasında farklı tipte gelirse (ör. bir parçada bool,
+        diğerinde boş değerli boolean) tablolar birleştirilirken oluşan ortak tip saklanır.
+        """
+        dtypes = {}
+        for column in df.columns:
+            dtype = df[column].dtype
+            recorded = self.dtypes.get(column)
+            if recorded is not None:
+                dtype = pd.concat([pd.Series([], dtype=recorded), df[column].iloc[:0]]).dtype
+            if str(dtype) != recorded:
+                dtypes[column] = str(dtype)
+        if dtypes:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO column_types (name, dtype) VALUES (?, ?)", dtypes.items()
+            )
+            self.dtypes.update(dtypes)
+
+    def _restore_types(self, df):
+        """Depodan okunan sütunlara yüklenen parçalardaki pandas tiplerini geri uygular"""
+        if not self.dtypes:
+            # column_types tablosundan önce oluşturulmuş depolar
+            return normalize_frame(df)
+        for column in df.columns:
+            if column not in self.dtypes:
+                continue
+            dtype = pd.api.types.pandas_dtype(self.dtypes[column])
+            values = df[column]
+            if isinstance(dtype, pd.DatetimeTZDtype):
+                df[column] = pd.to_datetime(values, utc=True).dt.tz_convert(dtype.tz).astype(dtype)
+            elif values.isna().any() and dtype.kind in 'biu':
+                # Sonradan eklenen sütunun eski satırları NULL'dur; boş değer alabilen tipe çevrilir
+                df[column] = values.astype('boolean' if dtype.kind == 'b' else 'Int64')
             else:
-                print(f"  Sayfa {current_page} konumunda durduruluyor - Yanıt verisi yok.")
-            break
-    
-    return all_items
+                df[column] = values.astype(dtype)
+        return df
 
-def export_to_excel(all_items, filename, version_label):
-    if not all_items:
-        print("Dışa aktarılacak öğe yok.")
-        return
+    def _ensure_columns(self, df):
+        """Tabloları ilk parçada oluşturur, sonraki parçalardaki yeni sütunları ekler"""
+        if not self.columns:
+            # Sütun sırası akıştaki tablolarla aynı kalır; birleştirilmiş çıktı depo açıkken de değişmez
+            columns = list(df.columns)
+            definitions = ", ".join(f"{self._quote(c)} {self._sql_type(df[c].dtype)}" for c in columns)
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS meter_hours ({definitions}, "
+                f"PRIMARY KEY ({METER_COLUMN}, effectiveDate, versiyon_bilgisi))"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS latest_meter_hours ({definitions}, "
+                f"PRIMARY KEY ({METER_COLUMN}, effectiveDate))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS meter_hours_date ON meter_hours (effectiveDate)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS meter_hours_version ON meter_hours (versiyon_bilgisi, effectiveDate)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS latest_meter_hours_date ON latest_meter_hours (effectiveDate)"
+            )
+            if 'settlementPointId' in columns:
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS latest_meter_hours_point "
+                    "ON latest_meter_hours (settlementPointId, effectiveDate)"
+                )
+            self.columns = columns
+        for column in df.columns:
+            if column not in self.columns:
+                for table in ("meter_hours", "latest_meter_hours"):
+                    self.connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {self._quote(column)} {self._sql_type(df[column].dtype)}"
+                    )
+                self.columns.append(column)
+        self._record_types(df)
+
+    @staticmethod
+    def _text_timestamps(values):
+        """Saat dilimli zaman damgalarını sıralanabilir ISO metnine çevirir (2025-10-01T00:00:00+03:00)"""
+        text = values.dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+        return text.str.replace(r'([+-]\d{2})(\d{2})$', r'\1:\2', regex=True)
+
+    def _bounds(self, effective_start, effective_end):
+        bounds = pd.Series(pd.to_datetime([effective_start, effective_end], utc=True)).dt.tz_convert(LOCAL_TIMEZONE)
+        return tuple(self._text_timestamps(bounds))
+
+    def load(self, df):
+        """Parçayı tek işlemde yükler; aynı anahtarlı satırlar (yeniden çalıştırma) üzerine yazılır"""
+        if df.empty:
+            return
+        values = df.copy()
+        for column in values.columns:
+            if isinstance(values[column].dtype, pd.DatetimeTZDtype):
+                values[column] = self._text_timestamps(values[column])
+        values = values.astype(object).where(values.notna(), None)
+        names = ", ".join(self._quote(c) for c in values.columns)
+        placeholders = ", ".join("?" * len(values.columns))
+        with METRICS.stage("store_load"), self.lock:
+            with self.connection:
+                self._ensure_columns(df)
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO meter_hours ({names}) VALUES ({placeholders})",
+                    values.itertuples(index=False, name=None),
+                )
+
+    def versions(self, effective_start, effective_end):
+        """Depoda bu efektif aralık için bulunan versiyon etiketlerini döndürür"""
+        if not self.columns:
+            return set()
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT versiyon_bilgisi FROM meter_hours WHERE effectiveDate BETWEEN ? AND ?",
+                self._bounds(effective_start, effective_end),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def refresh_latest(self, effective_start, effective_end):
+        """Efektif aralığın en yeni versiyon satırlarını latest_meter_hours tablosuna yeniden yazar.
+
+        Anahtar başına en yeni versiyon, birincil anahtar indeksi üzerinden
+        tek bir ilişkili alt sorguyla bulunur.
+        """
+        bounds = self._bounds(effective_start, effective_end)
+        names = ", ".join(self._quote(c) for c in self.columns)
+        with METRICS.stage("store_refresh_latest"), self.lock:
+            with self.connection:
+                self.connection.execute("DELETE FROM latest_meter_hours WHERE effectiveDate BETWEEN ? AND ?", bounds)
+                self.connection.execute(
+                    f"INSERT INTO latest_meter_hours ({names}) "
+                    f"SELECT {names} FROM meter_hours AS m WHERE m.effectiveDate BETWEEN ? AND ? "
+                    f"AND m.versiyon_bilgisi = (SELECT MAX(versiyon_bilgisi) FROM meter_hours "
+                    f"WHERE {METER_COLUMN} IS m.{METER_COLUMN} AND effectiveDate = m.effectiveDate)",
+                    bounds,
+                )
 
-    print(f"  {len(all_items)} kayıt Excel'e aktarılıyor...")
+    def resolve(self, effective_start, effective_end):
+        """Birleştirme için (sayaç × versiyon kayıt sayıları, seçilen kayıtlar, anahtar sütunları) döndürür.
+
+        resolve_latest_versions ile aynı biçimdedir; kayıt sayıları SQL ile
+        gruplanır, seçilen kayıtlar materyalize tablodan okunur ve yüklenirken
+        kaydedilen pandas tiplerine geri çevrilir.
+        """
+        self.refresh_latest(effective_start, effective_end)
+        bounds = self._bounds(effective_start, effective_end)
+        with self.lock:
+            counts_df = pd.read_sql_query(
+                f"SELECT {METER_COLUMN}, versiyon_bilgisi, COUNT(*) AS kayit FROM meter_hours "
+                f"WHERE effectiveDate BETWEEN ? AND ? GROUP BY {METER_COLUMN}, versiyon_bilgisi",
+                self.connection, params=bounds,
+            )
+            merged_df = pd.read_sql_query(
+                "SELECT * FROM latest_meter_hours WHERE effectiveDate BETWEEN ? AND ?",
+                self.connection, params=bounds,
+            )
+        keys = self._restore_types(counts_df[[METER_COLUMN, 'versiyon_bilgisi']].copy())
+        version_counts = pd.Series(counts_df['kayit'].to_numpy(), index=pd.MultiIndex.from_frame(keys))
+        return version_counts, self._restore_types(merged_df), [METER_COLUMN, 'effectiveDate']
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+_meter_store = None
+
+def get_meter_store():
+    """Etkinse paylaşılan SQLite deposunu döndürür"""
+    global _meter_store
+    if not STORE_PATH:
+        return None
+    if _meter_store is None:
+        _meter_store = MeterStore(STORE_PATH)
+    return _meter_store
+
+def close_meter_store():
+    global _meter_store
+    if _meter_store is not None:
+        _meter_store.close()
+        _meter_store = None
+
+def build_version_summary(version_counts, merged_df, meter_col):
+    """Sayaç başına görülen versiyonları, kazanan versiyonu ve ezilen saat sayısını hesaplar.
+
+    Tüm kayıtlar yerine (sayaç, versiyon) kayıt sayıları kullanılır.
+    """
+    versions = version_counts.index.to_frame(index=False).sort_values('versiyon_bilgisi')
+    version_groups = versions.groupby(meter_col, sort=True)['versiyon_bilgisi']
     
-    # Excel sütunları için iç içe geçmiş bileşenleri düzleştirme
-    flattened_data = []
-    for item in all_items:
-        row = item.copy()
-        row['versiyon_bilgisi'] = version_label
-        
-        # Tüm sözlük yapılarını otomatik olarak düzleştir (Veri kaybını önlemek için)
-        keys_to_flatten = ['settlementPoint', 'meter', 'readingType', 'usageType', 'meterReadingCompany']
-        for key in keys_to_flatten:
-            if key in row and isinstance(row[key], dict):
-                obj = row.pop(key)
-                for sub_key, value in obj.items():
-                    # Yeni sütun adı: nesne_özellik (örneğin: meter_id, meter_name)
-                    row[f"{key}_{sub_key}"] = value
+    summary = pd.DataFrame({
+        'bulunan_versiyonlar': version_groups.agg(', '.join),
+        'versiyon_sayisi': version_groups.size(),
+        'en_yeni_versiyon': version_groups.max(),
+        'toplam_kayit': version_counts.groupby(level=meter_col).sum(),
+        'secilen_saat': merged_df.groupby(meter_col).size(),
+    })
+    summary['ezilen_saat'] = summary['toplam_kayit'] - summary['secilen_saat']
+    return summary.rename_axis(meter_col).reset_index()
 
-        flattened_data.append(row)
+# Önceki sürümlerin genel düzleştirmesiyle yazılmış dosyalardaki sütun adları (ör. meter_id)
+LEGACY_COLUMNS = {
+    f"{key}_{sub_key}": column for key, mapping in NESTED_COLUMNS.items() for sub_key, column, _ in mapping
+}
 
-    df = pd.DataFrame(flattened_data)
+def unify_columns(df):
+    """Eski adlı sütunları (meter_id, settlementPoint_value...) şemadaki adlarına taşır"""
+    for legacy, column in LEGACY_COLUMNS.items():
+        if legacy not in df.columns:
+            continue
+        if column in df.columns:
+            # Eski ve yeni dosyalar birlikte birleştirildiğinde aynı alan iki sütuna dağılmıştır
+            df[column] = df[column].fillna(df[legacy]).astype(df[column].dtype)
+            df = df.drop(columns=[legacy])
+        else:
+            df = df.rename(columns={legacy: column})
+    return df
+
+def resolve_latest_versions(frames):
+    """Her (sayaç, effectiveDate) anahtarı için en yeni versiyonun kaydını seçer.
+
+    Tablolar sırayla okunur ve anahtar bazında çözümlenmiş sonuca katlanır;
+    bellekte yalnızca sonuç ile o anki tablo bulunur. Yeni tablonun anahtarları
+    sonucun hash indeksinde aranır: sonuçta olmayan anahtarlar eklenir, ortak
+    anahtarlarda versiyonu daha yeni olan kayıt kalır. Satırlar sıralanmaz;
+    yalnızca birden çok versiyon taşıyan tablo (artımlı moddaki saklanan sonuç)
+    önce kendi içinde versiyon sırasına konur. Böylece bir versiyon yalnızca
+    gerçekten sağladığı saatleri ezer ve tabloların geliş sırası sonucu
+    değiştirmez. (sayaç × versiyon kayıt sayıları, seçilen kayıtlar, anahtar
+    sütunları) döndürür.
+    """
+    merged_df = None
+    merged_keys = None
+    merged_versions = set()
+    counts = []
+    key_cols = []
+    for frame in frames:
+        frame = unify_columns(frame)
+        # Özet için tüm kayıtlar yerine (sayaç, versiyon) kayıt sayıları tutulur
+        count_cols = [c for c in [METER_COLUMN, 'versiyon_bilgisi'] if c in frame.columns]
+        counts.append(frame.groupby(count_cols, dropna=False).size())
+        
+        key_cols = [c for c in [METER_COLUMN, 'effectiveDate'] if c in frame.columns]
+        if not key_cols:
+            merged_df = frame if merged_df is None else pd.concat([merged_df, frame], ignore_index=True)
+            continue
+        frame_versions = set(frame['versiyon_bilgisi'].fillna('').unique())
+        if len(frame_versions) > 1:
+            frame = frame.sort_values('versiyon_bilgisi', ascending=False, kind='stable')
+        keys = pd.MultiIndex.from_frame(frame[key_cols])
+        unique = ~keys.duplicated(keep='first')
+        frame, keys = frame[unique], keys[unique]
+        if merged_df is None:
+            merged_df, merged_keys, merged_versions = frame, keys, frame_versions
+            continue
+        
+        # Ortak anahtarlarda daha yeni versiyonun kaydı kalır; eşitlikte mevcut kayıt korunur.
+        # Tablonun tüm versiyonları sonuçtakilerden eskiyse (ya da yeniyse) satır bazında karşılaştırma gerekmez
+        shared = keys.isin(merged_keys)
+        if not shared.any() or max(frame_versions) < min(merged_versions):
+            newer = None
+        elif min(frame_versions) > max(merged_versions):
+            newer = shared
+        else:
+            current = pd.Series(merged_df['versiyon_bilgisi'].fillna('').to_numpy(), index=merged_keys)
+            current = current.reindex(keys).fillna('').to_numpy()
+            newer = shared & (frame['versiyon_bilgisi'].fillna('').to_numpy() > current)
+        taken = ~shared
+        if newer is not None and newer.any():
+            kept = ~merged_keys.isin(keys[newer])
+            merged_df, merged_keys = merged_df[kept], merged_keys[kept]
+            taken |= newer
+        merged_df = pd.concat([merged_df, frame[taken]], ignore_index=True)
+        merged_keys = merged_keys.append(keys[taken])
+        merged_versions |= frame_versions
+        del frame
     
-    # Excel'e Kaydet (Mutlak yol kullan)
-    path = os.path.join(SCRIPT_DIR, filename)
-    df.to_excel(path, index=False)
-    print(f"  BAŞARILI: Veriler {filename} dosyasına aktarıldı\n")
+    version_counts = pd.concat(counts)
+    version_counts = version_counts.groupby(level=list(range(version_counts.index.nlevels))).sum()
+    return version_counts, merged_df, key_cols
+
+@timed("merge_version_frames")
+def merge_version_frames(frames, output_filename, state=None, store=None, effective_range=None):
+    """Versiyon tablolarını birleştirir, en yeni versiyonu önceliklendirir.
 
-def merge_excel_files(filenames, output_filename):
-    """Oluşturulan Excel dosyalarını birleştirir, en yeni versiyonu önceliklendirir"""
-    print(f"\n{'*'*60}")
-    print(f"[BİRLEŞTİRME] {len(filenames)} dosya birleştiriliyor...")
-    print(f"{'*'*60}")
+    frames tembel bir akış olabilir; tablolar sırayla okunup sonuca katlanır.
+    Depo verilirse en yeni versiyon seçimi depodaki materyalize tablodan,
+    efektif aralığın tüm versiyonları üzerinden yapılır ve frames okunmaz.
+    """
+    if store is not None:
+        version_counts, merged_df, key_cols = store.resolve(*effective_range)
+    else:
+        # En yeni versiyon her saat için anahtar indeksi üzerinden, tablolar geldikçe seçilir
+        version_counts, merged_df, key_cols = resolve_latest_versions(frames)
+    if key_cols:
+        logger.info(f"  Tekrarlar temizlendi (En yeni versiyonlar korundu): {int(version_counts.sum())} -> {len(merged_df)}")
     
-    all_dfs = []
-    for f in filenames:
-        try:
-            # Okurken mutlak yol oluştur
-            path = os.path.join(SCRIPT_DIR, f)
-            df = pd.read_excel(path)
-            print(f"    {f}: {len(df)} satır yüklendi")
-            all_dfs.append(df)
-        except Exception as e:
-            print(f"  HATA: {f} okunurken hata oluştu: {e}")
-    
-    if not all_dfs:
-        print("  Birleştirilecek veri bulunamadı.")
-        return
-        
-    # Tüm verileri birleştir
-    merged_df = pd.concat(all_dfs, ignore_index=True)
-    
-    # Sıralama: Versiyon sütununa göre büyükten küçüğe (en yeni versiyon en üstte)
-    if 'versiyon_bilgisi' in merged_df.columns:
-        merged_df = merged_df.sort_values(by='versiyon_bilgisi', ascending=False)
-    
-    # Benzersiz anahtara göre tekrarları kaldır (en yeniyi tut)
-    # Saatlik veri olduğu için 'effectiveDate' (tarih+saat içerir) bilgisini kullanıyoruz
-    # Hem orijinal (meterId) hem de düzleştirilmiş (meter_id) sütun isimlerini kontrol ediyoruz
-    subset_cols = ['meterId', 'meter_id', 'effectiveDate']
-    available_cols = [c for c in subset_cols if c in merged_df.columns]
-    
-    if available_cols:
-        before_count = len(merged_df)
-        merged_df = merged_df.drop_duplicates(subset=available_cols, keep='first')
-        after_count = len(merged_df)
-        print(f"  Tekrarlar temizlendi (En yeni versiyonlar korundu): {before_count} -> {after_count}")
-    
-    # Sıralama: Son olarak kullanıcı kolaylığı için sayaç ve tarihe göre artan sıralama
-    # meterId veya meter_id hangisi varsa ona göre sırala
-    sort_cols = ['meterId', 'meter_id', 'effectiveDate']
-    final_sort_cols = [c for c in sort_cols if c in merged_df.columns]
-    if final_sort_cols:
-        merged_df = merged_df.sort_values(by=final_sort_cols, ascending=True)
-        print(f"  Veriler sıralandı: {final_sort_cols}")
+    # Sıralama: Son olarak kullanıcı kolaylığı için sayaç ve tarihe göre artan sıralama (tek sıralama)
+    if key_cols:
+        merged_df = merged_df.sort_values(by=key_cols, ascending=True, kind='stable')
+        logger.info(f"  Veriler sıralandı: {key_cols}")
     
     # Birleşen sayaç listesini yazdır ve versiyon özeti çıkar
-    meter_col = 'meterId' if 'meterId' in merged_df.columns else 'meter_id' if 'meter_id' in merged_df.columns else None
-    if meter_col and 'versiyon_bilgisi' in merged_df.columns:
-        print(f"  [SÜRÜM ÖZETİ] Sayaç bazlı versiyon takibi:")
-        unique_meters = merged_df[meter_col].unique().tolist()
-        for meter in unique_meters:
-            meter_data = merged_df[merged_df[meter_col] == meter]
-            versions = sorted(meter_data['versiyon_bilgisi'].unique().tolist())
-            latest = versions[-1] # Sıralı listenin sonuncusu en yenidir
-            
+    summary_df = None
+    meter_col = METER_COLUMN
+    if meter_col in merged_df.columns and 'versiyon_bilgisi' in merged_df.columns:
+        summary_df = build_version_summary(version_counts, merged_df, meter_col)
+        conflicts = int((summary_df['versiyon_sayisi'] > 1).sum())
+        logger.info(f"  [SÜRÜM ÖZETİ] {len(summary_df)} sayaç, {conflicts} sayaçta versiyon çakışması, "
+              f"{int(summary_df['ezilen_saat'].sum())} saat yeni versiyonla güncellendi:")
+        for row in summary_df.head(SUMMARY_PRINT_LIMIT).itertuples(index=False):
+            meter = getattr(row, meter_col)
             # Eğer birden fazla versiyon varsa çakışma detayını yazdır
-            if len(versions) > 1:
-                print(f"    - Sayaç {meter}: {versions} versiyonları bulundu. Çakışan kayıtlarda {latest} (en yeni) tercih edildi.")
+            if row.versiyon_sayisi > 1:
+                logger.info(f"    - Sayaç {meter}: [{row.bulunan_versiyonlar}] versiyonları bulundu. "
+                      f"Çakışan {row.ezilen_saat} saatte {row.en_yeni_versiyon} (en yeni) tercih edildi.")
             else:
-                print(f"    - Sayaç {meter}: Sadece {latest} versiyonunda veri bulundu.")
+                logger.info(f"    - Sayaç {meter}: Sadece {row.en_yeni_versiyon} versiyonunda veri bulundu.")
+        if len(summary_df) > SUMMARY_PRINT_LIMIT:
+            logger.info(f"    ... ve {len(summary_df) - SUMMARY_PRINT_LIMIT} sayaç daha (tamamı SURUM_OZETI içinde)")
     
     # Mutlak yol ile kaydet
-    final_path = os.path.join(SCRIPT_DIR, output_filename)
-    merged_df.to_excel(final_path, index=False)
-    print(f"  TAMAMLANDI: Birleştirilmiş veri {output_filename} dosyasına kaydedildi.\n")
+    write_frame(merged_df, output_filename, summary_df)
+    logger.info(f"  TAMAMLANDI: Birleştirilmiş veri {output_filename} dosyasına kaydedildi.")
+    
+    # Sütunlu biçimlerde Excel yalnızca isteğe bağlı son rapordur
+    if not output_filename.endswith(".xlsx") and WRITE_EXCEL_REPORT:
+        report_filename = os.path.splitext(output_filename)[0] + ".xlsx"
+        write_frame(merged_df, report_filename, summary_df)
+        logger.info(f"  TAMAMLANDI: Excel raporu {report_filename} dosyasına kaydedildi.")
+    
+    # Artımlı modda çözümlenmiş sonuç bir sonraki çalışmaya taban olarak saklanır.
+    # Durum ancak çıktılar yazıldıktan sonra kaydedilir; yazma hatası versiyonları "birleştirildi" saydırmaz
+    if state is not None:
+        state.save(merged_df, version_counts.index.get_level_values('versiyon_bilgisi').dropna().unique())
+    logger.info("")
+    return summary_df
 
 def generate_month_range(start_date, end_date):
     """İki tarih arasındaki ayları geri döndürür (en yeniden en eskiye)"""
@@ -274,81 +2016,467 @@ def generate_month_range(start_date, end_date):
     
     return months
 
-def main():
+def next_month(dt):
+    """Bir sonraki ayın aynı gün/saatini döndürür"""
+    if dt.month == 12:
+        return dt.replace(year=dt.year + 1, month=1)
+    return dt.replace(month=dt.month + 1)
+
+def parse_periods(spec):
+    """'2025-01:2025-10' aralığını ya da '2025-07,2025-09' listesini (karışık da olabilir) ay başlarına çevirir"""
+    periods = set()
+    for part in spec.split(','):
+        first, _, last = part.strip().partition(':')
+        start = datetime.datetime.strptime(first, '%Y-%m')
+        end = datetime.datetime.strptime(last, '%Y-%m') if last else start
+        periods.update(generate_month_range(end, start))
+    return sorted(periods)
+
+def period_bounds(period_dt):
+    """Efektif ay için (başlangıç, bitiş) tarih dizgilerini üretir"""
+    end_dt = next_month(period_dt) - datetime.timedelta(minutes=1)
+    return period_dt.strftime('%Y-%m-%dT%H:%M:00+03:00'), end_dt.strftime('%Y-%m-%dT%H:%M:00+03:00')
+
+def plan_period(effective_start, effective_end, current_month_start):
+    """Efektif dönem için sorgulanacak versiyonları planlar"""
+    effective_start_dt = datetime.datetime.fromisoformat(effective_start.replace('+03:00', ''))
+    
+    # Bitiş versiyonu = Efektif ay + 1 ay; aylar geçerli aydan bitiş versiyonuna kadar (en yeniden en eskiye)
+    end_version_dt = next_month(effective_start_dt)
+    return {
+        "label": effective_start_dt.strftime('%Y-%m'),
+        "start": effective_start,
+        "end": effective_end,
+        "months": generate_month_range(current_month_start, end_version_dt),
+        "end_version": end_version_dt,
+    }
+
+def process_version(ticket_manager, idx, total, month_dt, plan, manifest=None, page_size=None, export_pool=None):
+    """Dönemin tek bir versiyonunu çeker ve aktarır; (dosya adı, ara dosya yolu, kayıt sayısı) döndürür.
+
+    Süreç havuzu verilirse ham sayfalar havuza gönderilir ve sonucun Future
+    nesnesi döner; sonuç complete_version ile alınır.
+    """
+    version_str = month_dt.strftime('%Y-%m-01T00:00:00+03:00')
+    month_label = month_dt.strftime('%Y-%m')
+    eff_period_label = plan["label"]
+    
+    if manifest is not None and manifest.version_status(month_label) == "empty":
+        logger.info(f"[VERSİYON {idx}/{total}] Atlandı: {eff_period_label} / {month_label} (kontrol noktasına göre veri yok)")
+        return None, None, 0
+    
+    logger.info(f"[VERSİYON {idx}/{total}] İşleniyor: {eff_period_label} / {month_label}")
+    
+    # Sayfalar çekildikçe düzleştirilir, tiplenir ve (isteğe bağlı) diske akıtılır (her versiyon işçisi kendi oturumunu kullanır)
+    pages = iter_version_pages(
+        get_worker_session(), ticket_manager, version_str, plan["start"], plan["end"],
+        manifest=manifest, page_size=page_size
+    )
+    
+    if export_pool is not None:
+        # Havuzda yer, sayfalar çekilmeden ayrılır; havuz doluyken yeni versiyon ağdan çekilip bellekte bekletilmez
+        export_pool.acquire()
+        try:
+            pages = list(pages)
+        except BaseException:
+            export_pool.release()
+            raise
+        # Tablolaştırma ve yazma havuzda sürerken sıradaki versiyona geçilir
+        return export_pool.submit(pages, idx, total, month_label, eff_period_label)
+    
+    result = export_version(pages, idx, total, month_label, eff_period_label)
+    if manifest is not None:
+        manifest.set_version_status(month_label, "done" if result[2] else "empty")
+    return result
+
+class ExportPool:
+    """Versiyon tablolaştırma ve dosya yazma işini süreç havuzuna veren aşama.
+
+    Versiyon iş parçacıkları ham sayfaları havuza verip sıradaki versiyona
+    geçer; ağ ve CPU işi böylece çakışır. Aynı anda en fazla
+    MAX_INFLIGHT_VERSIONS versiyon çekilir ya da havuzda işlenir; yer
+    sayfalar çekilmeden acquire ile ayrılır ve iş bitince bırakılır. Sınır
+    doluyken iş parçacığı bekler, çekme hızı işleme hızına bağlanır ve bellek
+    sınırlı kalır. Alt süreçler tabloları ana sürece geri göndermez, diske
+    yazıp yolunu döndürür. Alt süreçler çalışan iş parçacıklarından kilit
+    devralmasın diye her platformda "spawn" ile başlatılır.
+    """
+
+    # Alt süreçlere aktarılan yapılandırma (spawn ile modül varsayılanlarıyla yüklenir)
+    SETTINGS = ("SCRIPT_DIR", "CHECKPOINT_DIR", "OUTPUT_FORMAT", "WRITE_VERSION_FILES", "EXPORT_CHUNK_SIZE",
+                "EXCEL_MAX_ROWS", "LOCAL_TIMEZONE")
+
+    def __init__(self, processes=EXPORT_PROCESSES, max_inflight=MAX_INFLIGHT_VERSIONS):
+        self.executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        self.slots = threading.BoundedSemaphore(max_inflight)
+        self.settings = {name: globals()[name] for name in self.SETTINGS}
+        self.quiet = logger.level >= logging.WARNING
+
+    def acquire(self):
+        """Bir versiyon için yer ayırır; sınır doluysa bekler"""
+        self.slots.acquire()
+
+    def release(self):
+        self.slots.release()
+
+    def submit(self, pages, idx, total, month_label, eff_period_label):
+        """Yeri acquire ile ayrılmış versiyonun sayfalarını havuza verir; yer iş bitince bırakılır"""
+        try:
+            future = self.executor.submit(export_version_process, self.settings, self.quiet,
+                                          pages, idx, total, month_label, eff_period_label)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def close(self):
+        self.executor.shutdown()
+
+def export_version_process(settings, quiet, pages, idx, total, month_label, eff_period_label):
+    """Süreç havuzu işi: ham sayfaları tablolaştırır ve versiyon dosyasını yazar.
+
+    Parçalar kontrol noktası dizinindeki ara dosyaya eklenir; tablo ana sürece
+    gönderilmez. (dosya adı, ara dosya yolu, kayıt sayısı, aşama süreleri)
+    döndürür; depo yalnızca ana süreçte yazılır.
+    """
+    global STORE_PATH
+    globals().update(settings)
+    STORE_PATH = None
+    configure_logging(quiet)
+    METRICS.reset()
+    return export_version(pages, idx, total, month_label, eff_period_label) + (METRICS.stages,)
+
+def complete_version(result, manifest=None, month_label=None):
+    """process_version sonucunu (dosya adı, ara dosya yolu, kayıt sayısı) olarak döndürür.
+
+    Havuza verilmişse işin bitmesini bekler ve depoyu alt sürecin yazdığı
+    parçalarla ana süreçte doldurur.
+    """
+    if not isinstance(result, Future):
+        return result
+    filename, spool, row_count, stages = result.result()
+    METRICS.add_stages(stages)
+    store = get_meter_store()
+    if store is not None and spool is not None:
+        for chunk in read_spool(spool):
+            store.load(chunk)
+    if manifest is not None:
+        manifest.set_version_status(month_label, "done" if row_count else "empty")
+    return filename, spool, row_count
+
+def discover_versions(jobs, ticket_manager, manifests, catalog):
+    """(dönem, versiyon) işlerinden yayınlanmış olanları döndürür.
+
+    Kontrol noktasında durumu bilinen versiyonlar yoklanmaz; diğerleri tek
+    satırlık sorguyla eşzamanlı yoklanır ve yayınlanmadığı görülenler olumsuz
+    önbelleğe yazılır.
+    """
+    def exists(job):
+        plan, month_dt = job
+        status = manifests[plan["label"]].version_status(month_dt.strftime('%Y-%m'))
+        if status is not None:
+            return status != "empty"
+        return probe_version(get_worker_session(), ticket_manager, month_dt.strftime('%Y-%m-01T00:00:00+03:00'),
+                             plan["start"], plan["end"])
+
+    with METRICS.stage("discover_versions"), ThreadPoolExecutor(max_workers=MAX_VERSION_WORKERS) as executor:
+        found = list(executor.map(exists, jobs))
+    
+    published = []
+    for (plan, month_dt), exist in zip(jobs, found):
+        if exist is False:
+            catalog.mark_missing(plan, month_dt.strftime('%Y-%m'))
+        else:
+            published.append((plan, month_dt))
+    catalog.save()
+    logger.info(f"[KEŞİF] {len(jobs)} versiyon yoklandı: {len(published)} yayınlanmış, "
+          f"{len(jobs) - len(published)} yayınlanmamış.\n")
+    return published
+
+def store_frames(frames, store):
+    """Akıştaki parçaları yazıcıya iletirken depoya da yükler"""
+    for frame in frames:
+        store.load(frame)
+        yield frame
+
+def spool_path(eff_period_label, month_label):
+    """Versiyon parçalarının ara dosyası; kontrol noktası dizininde tutulur ve dönemle birlikte silinir"""
+    return os.path.join(CHECKPOINT_DIR, eff_period_label, month_label, "frames.pkl")
+
+def spool_frames(frames, path):
+    """Akıştaki parçaları yazıcıya iletirken ara dosyaya da ekler"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        for frame in frames:
+            pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            yield frame
+
+def read_spool(path):
+    """Ara dosyadaki parçaları yazıldıkları sırayla döndürür"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def read_version_spool(path):
+    """Bir versiyonun ara dosyasını tek tablo olarak okur"""
+    return pd.concat(read_spool(path), ignore_index=True)
+
+def export_version(pages, idx, total, month_label, eff_period_label):
+    """Versiyonun sayfa akışını tablolaştırır, isteğe bağlı olarak diske yazar.
+
+    Tablo bellekte toplanmaz. Depo açıksa parçalar depoya, değilse birleştirme
+    için ara dosyaya eklenir. (dosya adı, ara dosya yolu, kayıt sayısı) döndürür.
+    """
+    frames = iter_frames(pages, month_label)
+    filename = None
+    path = None
+    
+    store = get_meter_store()
+    if store is not None:
+        # Parçalar üretildikçe depoya yüklenir (parça başına bir işlem)
+        frames = store_frames(frames, store)
+    else:
+        path = spool_path(eff_period_label, month_label)
+        frames = spool_frames(frames, path)
+    
+    if WRITE_VERSION_FILES:
+        # Yeni açıklayıcı dosya ismi formatı (sütunlu biçimlerde versiyona göre bölümlenmiş dizin)
+        filename = version_output_path(eff_period_label, month_label)
+        row_count = export_frames(frames, filename, month_label)
+    else:
+        row_count = sum(len(chunk) for chunk in frames)
+    
+    if not row_count:
+        logger.info(f"  [{month_label}] Bu versiyon için veri bulunamadı.\n")
+        return None, None, 0
+    
+    logger.info(f"[VERSİYON {idx}/{total}] Tamamlandı: {month_label} ({row_count} kayıt)")
+    return filename, path, row_count
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EPİAŞ GDDK çok versiyonlu saatlik sayaç verisi dışa aktarımı")
+    parser.add_argument("--periods",
+                        help="Efektif dönemler: '2025-01:2025-10' aralığı veya '2025-07,2025-09' listesi "
+                             "(verilmezse effective_start_str/effective_end_str kullanılır)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Sayfa önbelleğini ve yayınlanmamış versiyon kaydını yok say, tüm sayfaları yeniden indir")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Sayfa önbelleğini tamamen devre dışı bırak")
+    parser.add_argument("--restart", action="store_true",
+                        help="Yarıda kalmış çalışmanın kontrol noktasını yok sayıp baştan başla")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Yalnızca son çalışmadan sonra yayınlanan versiyonları çekip saklanan sonuca ekle")
+    parser.add_argument("--store", nargs="?", const=os.path.join(SCRIPT_DIR, "gddk_store.sqlite"), default=STORE_PATH,
+                        help="Sayaç-saatlerini yerel SQLite deposuna da yükle ve birleştirmeyi depodan yap "
+                             "(dosya verilmezse gddk_store.sqlite)")
+    parser.add_argument("--processes", type=int, default=EXPORT_PROCESSES,
+                        help="Versiyon tablolaştırma ve dosya yazma işini yapan süreç sayısı (0 = iş parçacığında)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Yalnızca uyarı ve hataları yazdır")
+    parser.add_argument("--report", default=RUN_REPORT_PATH,
+                        help="Çalışma raporunun (JSON) yazılacağı dosya")
+    parser.add_argument("--prom-textfile", default=PROMETHEUS_TEXTFILE,
+                        help="Prometheus textfile toplayıcısı için metrik dosyası (.prom)")
+    return parser.parse_args(argv)
+
+def run_periods(plans, restart=False, incremental=False):
+    """Tüm (dönem × versiyon) işlerini tek oturum ve bilet havuzuyla çalıştırır; her dönem için bir çıktı üretir.
+
+    İş matrisi baştan planlanır ve tek bir versiyon havuzuna verilir; sayfa
+    istekleri dönemden bağımsız olarak ortak istek bütçesini paylaşır.
+    Sayfalama matrisin üçüncü boyutudur: her versiyonun sayfa sayısı ilk
+    sayfasıyla öğrenilir ve aynı bütçe içinde çekilir.
+    """
+    # Artımlı modda daha önce birleştirilmiş versiyonlar plandan çıkarılır
+    states = {}
+    if incremental:
+        for plan in plans:
+            state = PeriodState(plan["label"], plan["start"], plan["end"])
+            pending = state.missing([month_dt.strftime('%Y-%m') for month_dt in plan["months"]])
+            logger.info(f"[ARTIMLI] {plan['label']}: Daha önce birleştirilmiş {len(state.versions)} versiyon atlanıyor; "
+                  f"{len(pending)} versiyon sorgulanacak.")
+            plan["months"] = [month_dt for month_dt in plan["months"] if month_dt.strftime('%Y-%m') in pending]
+            states[plan["label"]] = state
+    
+    # Daha önce yayınlanmadığı görülen versiyonlar süre dolana kadar sorgulanmaz (--refresh ile yok sayılır)
+    catalog = VersionCatalog() if VERSION_DISCOVERY else None
+    if catalog is not None and not REFRESH_CACHE:
+        for plan in plans:
+            known = [month_dt for month_dt in plan["months"] if catalog.is_missing(plan, month_dt.strftime('%Y-%m'))]
+            if known:
+                logger.info(f"[KEŞİF] {plan['label']}: Yayınlanmadığı bilinen {len(known)} versiyon atlanıyor.")
+                plan["months"] = [month_dt for month_dt in plan["months"] if month_dt not in known]
+    
+    jobs = [(plan, month_dt) for plan in plans for month_dt in plan["months"]]
+    results = {plan["label"]: [] for plan in plans}
+    # Depo, versiyon işçileri başlamadan tek bağlantıyla açılır
+    store = get_meter_store()
+    failed_versions = {plan["label"]: [] for plan in plans}
+    export_pool = ExportPool(EXPORT_PROCESSES) if EXPORT_PROCESSES else None
+    
+    session = create_retry_session()
+    ticket_manager = TicketManager(session)
+    page_sizer = PageSizer(PAGE_SIZE, MAX_PAGE_SIZE)
+    manifests = {
+        plan["label"]: RunManifest(plan["label"], plan["start"], plan["end"], restart=restart)
+        for plan in plans
+    }
+    
+    page_sizes = {}
+    
+    # Versiyonlar birbirinden bağımsızdır; yalnızca bilet yöneticisi ve istek bütçesi paylaşılır
     try:
-        # Tarih aralığını hesapla
-        # Efektif başlangıç tarihini ayrıştır (Global değişkenleri kullanıyoruz)
-        effective_start_dt = datetime.datetime.fromisoformat(effective_start_str.replace('+03:00', ''))
+        if catalog is not None:
+            jobs = discover_versions(jobs, ticket_manager, manifests, catalog)
+        # Sayfa boyutu işçiler başlamadan sabitlenir; tüm versiyonlar belirlenen boyutla çekilir
+        page_sizes = settle_page_sizes(jobs, ticket_manager, manifests, page_sizer)
+        with ThreadPoolExecutor(max_workers=MAX_VERSION_WORKERS) as executor:
+            futures = [
+                executor.submit(process_version, ticket_manager, idx, len(jobs), month_dt,
+                                plan, manifests[plan["label"]], page_sizes[(plan["label"], month_dt.strftime('%Y-%m'))],
+                                export_pool)
+                for idx, (plan, month_dt) in enumerate(jobs, 1)
+            ]
+            # Birleştirme tüm versiyonlar bittikten sonra, versiyon sırası korunarak başlar
+            for (plan, month_dt), future in zip(jobs, futures):
+                try:
+                    results[plan["label"]].append((month_dt.strftime('%Y-%m'), complete_version(
+                        future.result(), manifests[plan["label"]], month_dt.strftime('%Y-%m')
+                    )))
+                except PageFetchError as e:
+                    logger.error(f"  HATA: {e}")
+                    failed_versions[plan["label"]].append(month_dt.strftime('%Y-%m'))
+    finally:
+        ticket_manager.close()
+        if export_pool is not None:
+            export_pool.close()
+        stats = ticket_manager.stats()
+        METRICS.set_info("tickets", stats)
+        logger.info(f"\n[BİLET] Verilen ST: {stats['issued']}, Boşa giden: {stats['wasted']}, "
+              f"TGT yenileme: {stats['refreshed']}")
+        rate = REQUEST_BUDGET.stats()
+        METRICS.set_info("rate", rate)
+        # Raporda her versiyonun gerçekten çekildiği boyut yer alır
+        METRICS.set_info("page_sizes", {
+            f"{period}/{month_label}": page_size for (period, month_label), page_size in page_sizes.items()
+        })
+        used_sizes = ", ".join(str(size) for size in sorted(set(page_sizes.values()))) or "-"
+        logger.info(f"[HIZ] Sayfa boyutu: {used_sizes}, Eşzamanlı istek sınırı: {rate['limit']}, "
+              f"Sınır düşürme: {rate['decreases']}")
+    
+    cache = get_page_cache()
+    if cache is not None:
+        METRICS.set_info("cache", {"hits": cache.hits, "misses": cache.misses})
+        logger.info(f"[ÖNBELLEK] Önbellekten okunan sayfa: {cache.hits}, Önbellekte bulunamayan: {cache.misses}")
+    
+    METRICS.set_info("periods", [plan["label"] for plan in plans])
+    incomplete = []
+    for plan in plans:
+        eff_period_label = plan["label"]
+        if failed_versions[eff_period_label]:
+            # Eksik versiyonla birleştirme yanlış "en yeni" sonucu üretir; kontrol noktası korunur
+            logger.error(f"\nEKSİK VERİ: {eff_period_label} döneminde {failed_versions[eff_period_label]} versiyonlarında "
+                  f"alınamayan sayfalar var. Betiği yeniden çalıştırın; kaldığı yerden devam edilecek.")
+            incomplete.append(eff_period_label)
+            continue
+        
+        # Versiyon tabloları ara dosyalarından en yeniden eskiye, birleştirme ilerledikçe birer birer okunur
+        versions = sorted(
+            ((month_label, spool) for month_label, (_, spool, row_count) in results[eff_period_label] if row_count),
+            reverse=True,
+        )
+        version_count = len(versions)
+        version_frames = (read_version_spool(spool) for _, spool in versions if spool is not None)
+        extension = {"parquet": ".parquet", "feather": ".arrow"}.get(OUTPUT_FORMAT, ".xlsx")
+        merged_filename = f"GDDK_{eff_period_label}_BIRLESTIRILMIS{extension}"
         
+        state = states.get(eff_period_label)
+        rewrite = False
+        if state is not None:
+            resolved_df = state.load_resolved()
+            # Birleştirilmiş çıktı silinmiş ya da yazılamamışsa saklanan sonuçtan yeniden üretilir
+            rewrite = resolved_df is not None and not os.path.exists(os.path.join(SCRIPT_DIR, merged_filename))
+            if not versions and not rewrite:
+                logger.info(f"[ARTIMLI] {eff_period_label}: Yeni yayınlanmış versiyon yok; birleştirilmiş çıktı güncel.")
+            elif resolved_df is not None:
+                if not versions:
+                    logger.warning(f"[ARTIMLI] {eff_period_label}: {merged_filename} bulunamadı; "
+                                   f"saklanan sonuçtan yeniden yazılıyor.")
+                # Saklanan sonuç, yeni versiyonlarla aynı "en yeni versiyon kazanır" kuralından geçer
+                version_frames = itertools.chain([resolved_df], version_frames)
+                version_count += 1
+                if store is not None:
+                    # Depo sonradan açıldıysa önceki çalışmaların versiyonları depoya taşınır
+                    stored = store.versions(plan["start"], plan["end"])
+                    store.load(resolved_df[~resolved_df['versiyon_bilgisi'].isin(stored)])
+        
+        if versions or rewrite:
+            logger.info(f"\n{'*'*60}")
+            logger.info(f"[BİRLEŞTİRME] {eff_period_label}: {version_count} versiyon birleştiriliyor...")
+            logger.info(f"{'*'*60}")
+            merge_version_frames(version_frames, merged_filename, state, store, (plan["start"], plan["end"]))
+        
+        # Birleştirme de tamamlandı; bir sonraki çalışma baştan başlar
+        manifests[eff_period_label].complete()
+    
+    return incomplete
+
+def main(argv=None):
+    global REFRESH_CACHE, CACHE_ENABLED, STORE_PATH, EXPORT_PROCESSES
+    args = parse_args(argv)
+    STORE_PATH = args.store
+    EXPORT_PROCESSES = args.processes
+    REFRESH_CACHE = REFRESH_CACHE or args.refresh
+    CACHE_ENABLED = CACHE_ENABLED and not args.no_cache
+    configure_logging(args.quiet)
+    METRICS.reset()
+    status = "failed"
+    
+    try:
         # Geçerli sistem tarihini al
         current_dt = datetime.datetime.now()
         current_month_start = current_dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         
-        # Bitiş versiyonu = Efektif ay + 1 ay
-        if effective_start_dt.month == 12:
-            end_version_dt = effective_start_dt.replace(year=effective_start_dt.year + 1, month=1)
+        # Dönem verilmezse yapılandırmadaki efektif tarih aralığı tek dönem olarak kullanılır
+        if args.periods:
+            ranges = [period_bounds(period_dt) for period_dt in parse_periods(args.periods)]
         else:
-            end_version_dt = effective_start_dt.replace(month=effective_start_dt.month + 1)
-        
-        # Ayları oluştur (geçerli aydan bitiş versiyonuna kadar)
-        months = generate_month_range(current_month_start, end_version_dt)
-        
-        # Görüntüleme için tarihleri formatla
-        fmt_start = effective_start_str.split('T')[0]
-        fmt_end = effective_end_str.split('T')[0]
+            ranges = [(effective_start_str, effective_end_str)]
+        plans = [plan_period(start, end, current_month_start) for start, end in ranges]
         
-        print(f"\n{'='*60}")
-        print(f"ÇOK VERSİYONLU SAATLIK SAYAÇ VERİSİ DIŞA AKTARIMI")
-        print(f"{'='*60}")
-        print(f"Efektif Tarih Aralığı: {fmt_start} - {fmt_end}")
-        print(f"Versiyon Aralığı: {current_month_start.strftime('%Y-%m')} → {end_version_dt.strftime('%Y-%m')}")
-        print(f"Toplam İşlenecek Versiyon: {len(months)}")
-        print(f"{'='*60}\n")
+        logger.info(f"\n{'='*60}")
+        logger.info(f"ÇOK VERSİYONLU SAATLIK SAYAÇ VERİSİ DIŞA AKTARIMI")
+        logger.info(f"{'='*60}")
+        for plan in plans:
+            # Görüntüleme için tarihleri formatla
+            fmt_start = plan["start"].split('T')[0]
+            fmt_end = plan["end"].split('T')[0]
+            logger.info(f"Efektif Tarih Aralığı: {fmt_start} - {fmt_end} | "
+                  f"Versiyon Aralığı: {current_month_start.strftime('%Y-%m')} → {plan['end_version'].strftime('%Y-%m')}")
+        logger.info(f"Toplam İşlenecek Versiyon: {sum(len(plan['months']) for plan in plans)} ({len(plans)} dönem)")
+        logger.info(f"{'='*60}\n")
         
-        session = create_retry_session()
-        tgt = get_tgt(session)
-        
-        generated_files = []
-        
-        # Ana döngü öncesi efektif dönem etiketi (Örn: 2025-09)
-        eff_period_label = effective_start_dt.strftime('%Y-%m')
+        incomplete = run_periods(plans, restart=args.restart, incremental=args.incremental or INCREMENTAL)
+        if incomplete:
+            status = "incomplete"
+            METRICS.set_info("incomplete_periods", incomplete)
+            return
         
-        # Her ay için döngü
-        for idx, month_dt in enumerate(months, 1):
-            version_str = month_dt.strftime('%Y-%m-01T00:00:00+03:00')
-            month_label = month_dt.strftime('%Y-%m')
-            
-            print(f"[VERSİYON {idx}/{len(months)}] İşleniyor: {month_dt.strftime('%Y-%m')}")
-            
-            # Bu versiyon için verileri çek
-            items = fetch_data_for_version(
-                session, tgt, version_str, effective_start_str, effective_end_str
-            )
-            
-            # Excel'e aktar
-            if items:
-                # Yeni açıklayıcı dosya ismi formatı
-                filename = f"GDDK_{eff_period_label}_Versiyon_{month_label}.xlsx"
-                export_to_excel(items, filename, month_label)
-                generated_files.append(filename)
-            else:
-                print(f"  Bu versiyon için veri bulunamadı.\n")
-        
-        # Dosyaları birleştir
-        if generated_files:
-            merged_filename = f"GDDK_{eff_period_label}_BIRLESTIRILMIS.xlsx"
-            merge_excel_files(generated_files, merged_filename)
-        
-        print(f"{'='*60}")
-        print(f"TÜM İŞLEMLER BAŞARIYLA TAMAMLANDI!")
-        print(f"{'='*60}")
+        status = "ok"
+        logger.info(f"{'='*60}")
+        logger.info(f"TÜM İŞLEMLER BAŞARIYLA TAMAMLANDI!")
+        logger.info(f"{'='*60}")
 
     except Exception as e:
-        print(f"\nBir hata oluştu: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"\nBir hata oluştu: {e}")
+    finally:
+        close_meter_store()
+        # Rapor, yarıda kalan ve hata veren çalışmalar için de yazılır
+        METRICS.write(status, args.report, args.prom_textfile)
 
 if __name__ == "__main__":
     main()
-
-
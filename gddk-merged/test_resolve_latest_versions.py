@@ -0,0 +1,65 @@
+import itertools
+import os
+import importlib.util
+
+import pandas as pd
+
+# Kök dizinde aynı adlı tek versiyon betiği bulunduğundan modül dosya yolundan yüklenir
+_spec = importlib.util.spec_from_file_location(
+    "gddk_hourly_meter_list", os.path.join(os.path.dirname(os.path.abspath(__file__)), "hourly_meter_list.py")
+)
+gddk = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gddk)
+
+HOURS = ["2025-10-01T00:00:00+03:00", "2025-10-01T01:00:00+03:00", "2025-10-01T02:00:00+03:00"]
+
+def version_frame(version, meters, hours=HOURS):
+    """Verilen sayaç ve saatler için tek versiyonlu tablo üretir; değer versiyonu taşır"""
+    rows = [(meter, hour) for meter in meters for hour in hours]
+    return pd.DataFrame({
+        "meterId": [meter for meter, _ in rows],
+        "effectiveDate": [hour for _, hour in rows],
+        "consumption": [float(version.replace("-", "")) for _ in rows],
+        "versiyon_bilgisi": version,
+    })
+
+def resolved(frames):
+    _, merged_df, key_cols = gddk.resolve_latest_versions(iter(frames))
+    return merged_df.sort_values(key_cols).reset_index(drop=True)
+
+def test_newest_version_wins_only_for_hours_it_provides():
+    frames = [
+        version_frame("2025-11", [1, 2]),
+        version_frame("2025-12", [1], hours=HOURS[:2]),
+        version_frame("2026-02", [2], hours=HOURS[1:]),
+    ]
+    result = resolved(frames).set_index(["meterId", "effectiveDate"])["versiyon_bilgisi"]
+
+    assert len(result) == 6
+    assert result[(1, HOURS[0])] == "2025-12"
+    assert result[(1, HOURS[1])] == "2025-12"
+    assert result[(1, HOURS[2])] == "2025-11"
+    assert result[(2, HOURS[0])] == "2025-11"
+    assert result[(2, HOURS[1])] == "2026-02"
+    assert result[(2, HOURS[2])] == "2026-02"
+
+def test_frame_order_does_not_change_result():
+    # Artımlı moddaki saklanan sonuç gibi birden çok versiyon taşıyan tablo da sıraya katılır
+    stored = pd.concat([version_frame("2025-11", [3]), version_frame("2026-01", [4], hours=HOURS[:1])],
+                       ignore_index=True)
+    frames = [
+        stored,
+        version_frame("2025-12", [1, 3, 4]),
+        version_frame("2026-02", [1], hours=HOURS[1:]),
+        version_frame("2025-10", [1, 2, 3, 4]),
+    ]
+    expected = resolved(frames)
+
+    for order in itertools.permutations(frames):
+        pd.testing.assert_frame_equal(resolved(list(order)), expected)
+    assert expected["consumption"].tolist() == [
+        float(version.replace("-", "")) for version in expected["versiyon_bilgisi"]
+    ]
+    assert expected.groupby("versiyon_bilgisi").size().to_dict() == {
+        "2025-10": 3, "2025-12": 6, "2026-01": 1, "2026-02": 2,
+    }
@@ -3,7 +3,17 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import json
 import datetime
-import pandas as pd
+import pickle
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from openpyxl import Workbook
+
+try:
+    import orjson
+except ImportError:  # Hızlı JSON çözümü isteğe bağlıdır; yoksa standart json kullanılır
+    orjson = None
 
 # Yapılandırma
 USERNAME = "USERNAME"
@@ -13,6 +23,28 @@ CAS_BASE_URL = "https://cas.epias.com.tr/cas/v1"
 BASE_URL = "https://epys.epias.com.tr/pre-reconciliation"
 HOURLY_LIST_URL = f"{BASE_URL}/v1/meter-data/approved-meter-data/hourly/list"
 
+# İlk sayfadan sonraki sayfaları eşzamanlı çeken işçi sayısı (1 = sıralı çekme)
+MAX_PAGE_WORKERS = 4
+
+# Eşzamanlı modda sırası gelmeden önden çekilebilecek en fazla sayfa (işçi sayısının katı)
+PAGE_WINDOW_FACTOR = 2
+
+# Akış hattı: yazıcıya tek seferde verilen satır sayısı (bellek tepe değeri buna bağlıdır)
+EXPORT_CHUNK_SIZE = 5000
+
+# API öğelerindeki iç içe nesnelerin sabit sütun eşlemesi: nesne -> [(alt alan, sütun)]
+# (gddk-merged betiği de aynı sütun adlarını üretir)
+NESTED_COLUMNS = {
+    'meter': [('id', 'meterId'), ('name', 'meterName'), ('eic', 'meterEic')],
+    'settlementPoint': [('value', 'settlementPointId'), ('label', 'settlementPointName')],
+    'readingType': [('value', 'readingTypeId'), ('label', 'readingType')],
+    'usageType': [('value', 'usageTypeId'), ('label', 'usageType')],
+    'meterReadingCompany': [('value', 'meterReadingCompanyId'), ('label', 'meterReadingCompany')],
+}
+
+# Her işçi iş parçacığı kendi oturumunu (bağlantı havuzunu) kullanır
+_thread_local = threading.local()
+
 def create_retry_session():
     session = requests.Session()
     retry = Retry(
@@ -89,7 +121,8 @@ def list_hourly_meter_datas(session, tgt, st, page_number=1):
     response = session.post(url, headers=headers, json=payload)
     
     if response.status_code == 200:
-        return response.json()
+        # Ham baytlar doğrudan çözülür; yalnızca öğeler ve sayfa bilgisi tutulur
+        return parse_list_response(response.content)
     else:
         print(f"BAŞARISIZ: Durum {response.status_code}")
         # Mümkünse tam hatayı yazdır
@@ -104,106 +137,201 @@ def list_hourly_meter_datas(session, tgt, st, page_number=1):
             print(response.text)
         return None
 
-def export_to_excel(all_items):
-    if not all_items:
-        print("Dışa aktarılacak öğe yok.")
+def json_loads(data):
+    """JSON metnini orjson kuruluysa onunla, değilse standart json ile çözer"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def parse_list_response(data):
+    """Liste yanıtını çözer ve yalnızca kullanılan body.content.items / page kısımlarını tutar.
+
+    Hata yanıtları (gövdesiz) olduğu gibi döndürülür.
+    """
+    response_data = json_loads(data)
+    body = response_data.get('body') if isinstance(response_data, dict) else None
+    if not body:
+        return response_data
+    content = body.get('content') or {}
+    return {'body': {'content': {'items': content.get('items', []), 'page': content.get('page', {})}}}
+
+def get_worker_session():
+    """İş parçacığına özel yeniden deneme oturumunu döndürür"""
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = create_retry_session()
+    return _thread_local.session
+
+def calculate_total_pages(page_info):
+    """API sayfa bilgisinden toplam sayfa sayısını hesaplar"""
+    # Güçlü sayfalama algılama
+    api_total_pages = page_info.get('totalPages', page_info.get('totalPageCount'))
+    if api_total_pages is not None:
+        return api_total_pages
+
+    # totalPages eksikse, 'total' öğe veya sayfa sayısı olabilir
+    total_val = page_info.get('total', 1)
+    size_val = page_info.get('size', 100)
+
+    # Sezgisel: total büyükse muhtemelen öğelerdir, küçükse muhtemelen sayfalardır
+    # Ancak güvenli olmakta fayda var: EPYS'de Sayfa içindeki 'total' genellikle toplam öğe sayısıdır
+    if total_val > 50: # Arbitrary threshold, but usually more than total pages
+        return (total_val + size_val - 1) // size_val
+    return total_val
+
+def fetch_page(session, tgt, page_number):
+    """Tek bir sayfayı kendi ST bileti ile çeker; (öğeler, sayfa bilgisi) veya None döndürür"""
+    st = get_st(session, tgt, HOURLY_LIST_URL)
+    response_data = list_hourly_meter_datas(session, tgt, st, page_number)
+
+    if response_data and 'body' in response_data and response_data['body']:
+        content = response_data['body'].get('content', {})
+        return content.get('items', []), content.get('page', {})
+
+    if response_data:
+        print(f"Sayfa {page_number} konumunda durduruluyor - Gövde boş veya hata oluştu.")
+    else:
+        print(f"Sayfa {page_number} konumunda durduruluyor - Yanıt verisi yok.")
+    return None
+
+def iter_pages(session, tgt, max_workers=MAX_PAGE_WORKERS):
+    """İlk sayfadan toplam sayfa sayısını öğrenir, sayfaları sırasıyla üretir (kalanlar eşzamanlı çekilir)"""
+    result = fetch_page(session, tgt, 1)
+    if result is None:
         return
 
-    print(f"\n[ADIM 4] {len(all_items)} kayıt Excel'e aktarılıyor...")
-    
-    # Excel sütunları için iç içe geçmiş bileşenleri düzleştirme
-    flattened_data = []
-    for item in all_items:
-        row = item.copy()
-        
-        # Varsa settlementPoint (Uzlaştırma Noktası) bilgisini düzleştir
-        sp = row.pop('settlementPoint', {})
-        if sp:
-            row['settlementPointId'] = sp.get('value')
-            row['settlementPointName'] = sp.get('label')
-            
-        # Varsa meter (Sayaç) bilgisini düzleştir
-        meter = row.pop('meter', {})
-        if meter:
-            row['meterId'] = meter.get('id')
-            row['meterName'] = meter.get('name')
-            row['meterEic'] = meter.get('eic')
-            
-        # readingType (Okuma Tipi) bilgisini düzleştir
-        rt = row.pop('readingType', {})
-        if rt:
-            row['readingType'] = rt.get('label')
-
-        # usageType (Kullanım Tipi) bilgisini düzleştir
-        ut = row.pop('usageType', {})
-        if ut:
-            row['usageType'] = ut.get('label')
-            
-        # meterReadingCompany (Sayaç Okuma Şirketi) bilgisini düzleştir
-        mrc = row.pop('meterReadingCompany', {})
-        if mrc:
-            row['meterReadingCompany'] = mrc.get('label')
-
-        flattened_data.append(row)
-
-    df = pd.DataFrame(flattened_data)
-    
-    # Excel'e Kaydet
-    filename = "hourly_meter_data.xlsx"
-    df.to_excel(filename, index=False)
-    print(f"BAŞARILI: Veriler {filename} dosyasına aktarıldı")
+    items, page_info = result
+    total_items = len(items)
+    print(f"Sayfa verisi alındı: {page_info}")
+    total_pages = calculate_total_pages(page_info)
+    print(f"Sayfa 1/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+    yield items
+
+    if max_workers <= 1:
+        # Sıralı mod: her sayfa bir öncekinin ardından çekilir
+        current_page = 2
+        while current_page <= total_pages:
+            result = fetch_page(session, tgt, current_page)
+            if result is None:
+                return
+            items, page_info = result
+            total_items += len(items)
+            print(f"Sayfa verisi alındı: {page_info}")
+            total_pages = calculate_total_pages(page_info)
+            print(f"Sayfa {current_page}/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+            yield items
+            current_page += 1
+        return
+
+    # Eşzamanlı mod: kalan sayfalar işçilere dağıtılır, her işçi kendi ST biletini alır
+    def worker(page_number):
+        return fetch_page(get_worker_session(), tgt, page_number)
+
+    # Bellekte sınırlı sayıda sayfa tutmak için kayan pencere kullanılır
+    window = max_workers * PAGE_WINDOW_FACTOR
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        next_page = 2
+        while pending or next_page <= total_pages:
+            while next_page <= total_pages and len(pending) < window:
+                pending.append((next_page, executor.submit(worker, next_page)))
+                next_page += 1
+
+            # Sonuçlar sayfa sırasına göre üretilir
+            page_number, future = pending.popleft()
+            result = future.result()
+            if result is None:
+                # Sıralı modda olduğu gibi ilk eksik sayfada durulur
+                for _, waiting in pending:
+                    waiting.cancel()
+                return
+            items, _ = result
+            total_items += len(items)
+            print(f"Sayfa {page_number}/{total_pages} getirildi ({len(items)} öğe, Toplam: {total_items})")
+            yield items
+
+def decode_items(items):
+    """Sayfa öğelerini satır sözlüğü kopyalamadan sütun listelerine çözer; {sütun: değerler} döndürür"""
+    columns = {}
+    first = items[0]
+    keys = list(first) + sorted(set().union(*items).difference(first))
+    keys += [key for key in NESTED_COLUMNS if key not in keys]
+    for key in keys:
+        mapping = NESTED_COLUMNS.get(key)
+        if mapping is None:
+            columns[key] = [item.get(key) for item in items]
+            continue
+        # İç içe nesneler sabit sütunlara eşlenir; nesne hiç gelmese de sütunlar bulunur
+        objects = [item.get(key) or {} for item in items]
+        for sub_key, column in mapping:
+            columns[column] = [obj.get(sub_key) for obj in objects]
+        # Şemada olmayan alt alanlar veri kaybı olmasın diye nesne_alan adıyla ayrıca eklenir
+        known = {sub_key for sub_key, _ in mapping}
+        for sub_key in sorted(set().union(*objects).difference(known)):
+            columns[f"{key}_{sub_key}"] = [obj.get(sub_key) for obj in objects]
+    return columns
+
+def iter_column_chunks(pages, chunk_size=EXPORT_CHUNK_SIZE):
+    """Sayfa akışını sayfa sınırlarında, yaklaşık chunk_size satırlık sütun parçalarına toplar"""
+    parts, row_count = [], 0
+    for items in pages:
+        if not items:
+            continue
+        parts.append((decode_items(items), len(items)))
+        row_count += len(items)
+        if row_count >= chunk_size:
+            yield parts
+            parts, row_count = [], 0
+    if parts:
+        yield parts
+
+def export_columns_to_excel(chunks, filename="hourly_meter_data.xlsx"):
+    """Sütun parçalarını yalnızca-yazma kipinde Excel'e yazar.
+
+    Bazı sütunlar (ör. nesne_alan) ancak sonraki sayfalarda görünebildiğinden
+    parçalar önce geçici bir ara dosyaya alınır; başlık tüm sütunlar
+    bilindikten sonra yazılır ve satırlar ara dosyadan okunarak akıtılır.
+    """
+    columns = {}
+    row_count = 0
+    with tempfile.TemporaryFile() as spool:
+        for parts in chunks:
+            if not columns:
+                print(f"\n[ADIM 4] Kayıtlar {filename} dosyasına akıtılıyor...")
+            for part, part_rows in parts:
+                # Başlık, sütunların görülme sırasıyla tüm parçalardan toplanır
+                columns.update(dict.fromkeys(part))
+                pickle.dump((part, part_rows), spool, protocol=pickle.HIGHEST_PROTOCOL)
+                row_count += part_rows
+
+        if not columns:
+            # Dosya yalnızca en az bir satır geldiğinde oluşturulur
+            return 0
+        columns = list(columns)
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(columns)
+        spool.seek(0)
+        while True:
+            try:
+                part, part_rows = pickle.load(spool)
+            except EOFError:
+                break
+            values = [part[name] if name in part else [None] * part_rows for name in columns]
+            for row in zip(*values):
+                sheet.append(row)
+    workbook.save(filename)
+    print(f"BAŞARILI: {row_count} kayıt {filename} dosyasına aktarıldı")
+    return row_count
 
 def main():
     try:
         session = create_retry_session()
         tgt = get_tgt(session)
         
-        all_items = []
-        current_page = 1
-        total_pages = 1
-        
-        while current_page <= total_pages:
-            st = get_st(session, tgt, HOURLY_LIST_URL)
-            response_data = list_hourly_meter_datas(session, tgt, st, current_page)
-            
-            if response_data and 'body' in response_data and response_data['body']:
-                content = response_data['body'].get('content', {})
-                items = content.get('items', [])
-                all_items.extend(items)
-                
-                # Sayfalama bilgisini kontrol et
-                page_info = content.get('page', {})
-                print(f"Sayfa verisi alındı: {page_info}")
-                
-                # Güçlü sayfalama algılama
-                api_total_pages = page_info.get('totalPages', page_info.get('totalPageCount'))
-                if api_total_pages is not None:
-                    total_pages = api_total_pages
-                else:
-                    # totalPages eksikse, 'total' öğe veya sayfa sayısı olabilir
-                    total_val = page_info.get('total', 1)
-                    size_val = page_info.get('size', 100)
-                    
-                    # Sezgisel: total büyükse muhtemelen öğelerdir, küçükse muhtemelen sayfalardır
-                    # Ancak güvenli olmakta fayda var: EPYS'de Sayfa içindeki 'total' genellikle toplam öğe sayısıdır
-                    if total_val > 50: # Arbitrary threshold, but usually more than total pages
-                        total_pages = (total_val + size_val - 1) // size_val
-                    else:
-                        total_pages = total_val
-                
-                print(f"Sayfa {current_page}/{total_pages} getirildi ({len(items)} öğe, Toplam: {len(all_items)})")
-                
-                current_page += 1
-            else:
-                if response_data:
-                    print(f"Sayfa {current_page} konumunda durduruluyor - Gövde boş veya hata oluştu.")
-                else:
-                    print(f"Sayfa {current_page} konumunda durduruluyor - Yanıt verisi yok.")
-                break
+        # Sayfalar çekildikçe sütunlara çözülüp parça parça diske yazılır
+        row_count = export_columns_to_excel(iter_column_chunks(iter_pages(session, tgt)))
         
-        if all_items:
-            export_to_excel(all_items)
-        else:
+        if not row_count:
             print("İşlenecek veri bulunamadı.")
 
     except Exception as e:
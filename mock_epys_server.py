@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# EPİAŞ CAS ve EPYS saatlik sayaç servisinin yerel taklidi.
+# Gerçek kimlik bilgisi ve canlı trafik olmadan dışa aktarım betiklerini
+# çalıştırmak, hataları yeniden üretmek ve performansı ölçmek için kullanılır.
+#
+# Betikleri bu sunucuya yönlendirmek için:
+#   CAS_BASE_URL = "http://127.0.0.1:8765/cas/v1"
+#   BASE_URL = "http://127.0.0.1:8765/pre-reconciliation"
+
+LIST_PATH_SUFFIX = "/v1/meter-data/approved-meter-data/hourly/list"
+
+# Sayfa bilgisinin hangi alanla döndürüleceği (betiklerdeki sayfalama sezgiselinin tüm dalları)
+PAGE_STYLES = ["total", "totalPages", "totalPageCount", "total-as-pages"]
+
+class MockConfig:
+    """Sunucu davranışını belirleyen ayarlar"""
+
+    def __init__(self, meters=50, hours=None, versions=None, page_style="total", latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, ticket_expiry=0, max_page_size=0,
+                 cap_page_size=0, seed=0):
+        self.meters = meters
+        # Verilmezse efektif tarih aralığındaki saat sayısı kullanılır
+        self.hours = hours
+        # Yayınlanmış versiyonlar ("2025-12" gibi); None ise tüm versiyonlar yayınlanmış sayılır
+        self.versions = set(versions) if versions else None
+        self.page_style = page_style
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        # Bir TGT'nin kaç ST verdikten sonra geçersiz sayılacağı (0 = süresiz)
+        self.ticket_expiry = ticket_expiry
+        # Bu boyutu aşan sayfa istekleri 400 ile reddedilir (0 = sınırsız)
+        self.max_page_size = max_page_size
+        # Bu boyutu aşan sayfa istekleri sessizce bu boyuta kısılır (0 = kısılmaz)
+        self.cap_page_size = cap_page_size
+        self.random = random.Random(seed)
+
+class MockState:
+    """Bilet kayıtları ve istek sayaçları (iş parçacığı güvenli)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tgts = {}
+        self.service_tickets = set()
+        self.stats = {"tgt": 0, "st": 0, "list": 0, "pages": 0, "rows": 0, "bytes": 0,
+                      "errors": 0, "throttled": 0, "rejected": 0}
+
+    def count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+def parse_effective_hours(payload):
+    """İstekteki efektif tarih aralığından (başlangıç, saat sayısı) üretir"""
+    start = datetime.datetime.fromisoformat(payload["effectiveDateStart"])
+    end = datetime.datetime.fromisoformat(payload["effectiveDateEnd"])
+    return start, int((end - start).total_seconds() // 3600) + 1
+
+def build_item(index, hours, start, version):
+    """Sıra numarasından belirlenimci bir saatlik kayıt üretir (versiyona göre değerler değişir)"""
+    meter, hour = divmod(index, hours)
+    version_offset = int(version.replace("-", "")) % 100 / 100
+    return {
+        "effectiveDate": (start + datetime.timedelta(hours=hour)).isoformat(),
+        "consumption": round(meter * 0.5 + hour * 0.01 + version_offset, 3),
+        "generation": 0.0,
+        "meter": {"id": 100000 + meter, "name": f"Sayaç {meter}", "eic": f"40Z{meter:013d}"},
+        "settlementPoint": {"value": 5000 + meter, "label": f"UEVÇB {meter}"},
+        "readingType": {"value": 1, "label": "Otomatik"},
+        "usageType": {"value": 2, "label": "Mesken"},
+        "meterReadingCompany": {"value": 3, "label": "Dağıtım Şirketi"},
+    }
+
+def build_page_info(style, number, size, total_items):
+    total_pages = max(1, (total_items + size - 1) // size)
+    if style == "totalPages":
+        return {"number": number, "size": size, "totalPages": total_pages}
+    if style == "totalPageCount":
+        return {"number": number, "size": size, "totalPageCount": total_pages}
+    if style == "total-as-pages":
+        return {"number": number, "size": size, "total": total_pages}
+    return {"number": number, "size": size, "total": total_items}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.state.count(bytes=len(data))
+
+    def _send_errors(self, status, code, message):
+        self._send(status, json.dumps({"errors": [{"errorCode": code, "errorMessage": message}]}))
+
+    def do_GET(self):
+        # Sayaçlar: kıyaslama betiği istek/sayfa/satır sayılarını buradan okur
+        if urlparse(self.path).path == "/stats":
+            return self._send(200, json.dumps(self.state.snapshot()))
+        self._send(404, "")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parsed = urlparse(self.path)
+        if parsed.path.endswith("/cas/v1/tickets"):
+            return self._issue_tgt()
+        if "/cas/v1/tickets/" in parsed.path:
+            return self._issue_st(parsed.path.rsplit("/", 1)[-1])
+        if parsed.path.endswith(LIST_PATH_SUFFIX):
+            return self._list(parse_qs(parsed.query).get("ticket", [""])[0], body)
+        self._send(404, "")
+
+    def _issue_tgt(self):
+        tgt = f"TGT-{uuid.uuid4().hex}"
+        with self.state.lock:
+            self.state.tgts[tgt] = 0
+        self.state.count(tgt=1)
+        host = self.headers.get("Host", "localhost")
+        self._send(201, "", "text/plain", {"Location": f"http://{host}/cas/v1/tickets/{tgt}"})
+
+    def _issue_st(self, tgt):
+        with self.state.lock:
+            uses = self.state.tgts.get(tgt)
+            valid = uses is not None and not (self.config.ticket_expiry and uses >= self.config.ticket_expiry)
+            if valid:
+                self.state.tgts[tgt] = uses + 1
+                st = f"ST-{uuid.uuid4().hex}"
+                self.state.service_tickets.add(st)
+        if not valid:
+            # Gerçek CAS, süresi dolmuş TGT için 404 döndürür
+            self.state.count(rejected=1)
+            return self._send(404, "TGT bulunamadı", "text/plain")
+        self.state.count(st=1)
+        self._send(200, st, "text/plain")
+
+    def _list(self, st, body):
+        self.state.count(list=1)
+        config = self.config
+        with self.state.lock:
+            tgt_uses = self.state.tgts.get(self.headers.get("TGT"))
+            expired = tgt_uses is None or (config.ticket_expiry and tgt_uses >= config.ticket_expiry)
+            # ST tek kullanımlıktır
+            valid_st = st in self.state.service_tickets
+            self.state.service_tickets.discard(st)
+            roll = config.random.random()
+        if expired or not valid_st:
+            self.state.count(rejected=1)
+            return self._send(401, "{}")
+
+        if config.latency or config.jitter:
+            time.sleep(config.latency + config.jitter * config.random.random())
+        if roll < config.throttle_rate:
+            self.state.count(throttled=1)
+            return self._send(429, "{}", headers={"Retry-After": str(config.retry_after)})
+        if roll < config.throttle_rate + config.error_rate:
+            self.state.count(errors=1)
+            return self._send(500, "{}")
+
+        payload = json.loads(body)
+        version = payload["version"][:7]
+        if config.versions is not None and version not in config.versions:
+            return self._send_errors(400, "PRE-0001", f"{version} versiyonu efektif dönem ile uyumsuzdur")
+
+        number = payload["page"]["number"]
+        size = payload["page"]["size"]
+        if config.max_page_size and size > config.max_page_size:
+            return self._send_errors(400, "PRE-0002", f"Sayfa boyutu en fazla {config.max_page_size} olabilir")
+        if config.cap_page_size:
+            size = min(size, config.cap_page_size)
+
+        start, hours = parse_effective_hours(payload)
+        hours = config.hours or hours
+        total_items = config.meters * hours
+        first = (number - 1) * size
+        items = [build_item(index, hours, start, version) for index in range(first, min(first + size, total_items))]
+        self.state.count(pages=1, rows=len(items))
+        self._send(200, json.dumps({"body": {"content": {
+            "items": items,
+            "page": build_page_info(config.page_style, number, size, total_items),
+        }}}))
+
+def start_server(config, host="127.0.0.1", port=0):
+    """Sunucuyu arka plan iş parçacığında başlatır; (sunucu, temel adres) döndürür"""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.state = MockState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EPİAŞ CAS/EPYS saatlik sayaç servisinin yerel taklidi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--meters", type=int, default=50, help="Sayaç sayısı")
+    parser.add_argument("--hours", type=int, help="Sayaç başına saat (verilmezse efektif aralıktan hesaplanır)")
+    parser.add_argument("--versions", help="Yayınlanmış versiyonlar, ör. 2025-11,2025-12 (verilmezse tümü)")
+    parser.add_argument("--page-style", choices=PAGE_STYLES, default="total",
+                        help="Sayfa bilgisinin biçimi (total = toplam öğe sayısı)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Liste yanıtı başına sabit gecikme (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Gecikmeye eklenen rastgele süre üst sınırı (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 döndürülecek liste isteği oranı")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429 döndürülecek liste isteği oranı")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 yanıtlarındaki Retry-After (sn)")
+    parser.add_argument("--ticket-expiry", type=int, default=0, help="TGT'nin geçersiz olacağı ST sayısı (0 = süresiz)")
+    parser.add_argument("--max-page-size", type=int, default=0, help="Daha büyük sayfa isteklerini 400 ile reddet")
+    parser.add_argument("--cap-page-size", type=int, default=0, help="Daha büyük sayfa isteklerini sessizce kıs")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = MockConfig(
+        meters=args.meters, hours=args.hours,
+        versions=args.versions.split(",") if args.versions else None,
+        page_style=args.page_style, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+        ticket_expiry=args.ticket_expiry, max_page_size=args.max_page_size,
+        cap_page_size=args.cap_page_size, seed=args.seed,
+    )
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"Sahte EPYS/CAS sunucusu çalışıyor: {base_url}")
+    print(f"  CAS_BASE_URL = \"{base_url}/cas/v1\"")
+    print(f"  BASE_URL = \"{base_url}/pre-reconciliation\"")
+    print(f"  Sayaçlar: {base_url}/stats")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()